@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+try:
+    import numpy as np
+except ImportError:  # analytics are optional, nothing is recorded without NumPy
+    np = None
+
+from card_format import SUITS
+
+LOGGER = logging.getLogger(__name__)
+
+# Columnar store of finished hands, one row per player per hand. Each column is a
+# raw little-endian file (<column>.bin) that is appended to in batches and read back
+# memory-mapped, so queries are vectorised NumPy over millions of rows. The number
+# of complete rows is kept in a separate file (rows) that is only advanced once every
+# column has been written, so a batch that fails halfway is cut off the columns
+# before the next one is appended.
+
+ANALYTICS_DIR = os.getenv('ANALYTICS_DIR', 'analytics')
+ANALYTICS = os.getenv('ANALYTICS', '1').lower() in ('1', 'true', 'yes')
+FLUSH_ROWS = 1024
+FLUSH_INTERVAL = 60  # seconds, so quiet periods still reach disk
+
+COLUMNS = {
+    'game_id': '<i8',  # store start time (unix seconds) << 24 | Game.game_id, unique across restarts
+    'hand': '<i2',  # hand number within the game
+    'seat': '<i1',  # 0 is the player who created the game
+    'players': '<i1',  # 3 or 4
+    'trump': '<i1',  # index into SUITS
+    'tricks': '<i1',  # tricks won this hand
+    'jacks': '<i1',  # jacks captured this hand
+    'score': '<i2',  # points scored this hand
+    'jacks_passed': '<i1',  # jacks this player passed on
+    'jacks_received': '<i1',  # jacks passed to this player
+}
+
+# Named queries for the admin command and CLI: (value, group by, description)
+QUERIES = {
+    'jacks-by-seat': ('jacks', ('players', 'seat'), "Jacks captured per hand by seat"),
+    'tricks-by-trump': ('tricks', ('players', 'trump', 'seat'), "Tricks won per hand by trump suit and seat"),
+    'score-by-jacks-received': ('score', ('players', 'jacks_received'), "Hand score by jacks passed to the player"),
+    'score-by-jacks-passed': ('score', ('players', 'jacks_passed'), "Hand score by jacks the player passed on"),
+}
+
+
+def enabled():
+    return ANALYTICS and np is not None
+
+
+class HandStore:
+    def __init__(self, path=ANALYTICS_DIR):
+        self.path = path
+        self.run_id = int(time.time())  # game ids restart at 1 every run, see COLUMNS
+        self.buffer = {column: [] for column in COLUMNS}
+        self.lock = None  # created on the running loop
+        self.task = None
+
+    def column_path(self, column):
+        return os.path.join(self.path, f"{column}.bin")
+
+    def game_key(self, game_id):
+        return self.run_id << 24 | game_id
+
+    def committed_rows(self):
+        # Rows written to every column. Stores from before the rows file existed
+        # use the shortest column.
+        try:
+            with open(os.path.join(self.path, 'rows')) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            pass
+        sizes = []
+        for column, dtype in COLUMNS.items():
+            try:
+                sizes.append(os.path.getsize(self.column_path(column)) // np.dtype(dtype).itemsize)
+            except OSError:
+                sizes.append(0)
+        return min(sizes)
+
+    def commit_rows(self, rows):
+        temp_path = os.path.join(self.path, 'rows.tmp')
+        with open(temp_path, 'w') as f:
+            f.write(str(rows))
+        os.replace(temp_path, os.path.join(self.path, 'rows'))
+
+    def append(self, **row):
+        for column in COLUMNS:
+            self.buffer[column].append(row[column])
+
+    def pending(self):
+        return len(self.buffer['game_id'])
+
+    def write(self, batch):
+        # Append a batch of rows to every column file. Blocking, run it in a thread.
+        os.makedirs(self.path, exist_ok=True)
+        rows = self.committed_rows()
+        for column, dtype in COLUMNS.items():
+            with open(self.column_path(column), 'ab') as f:
+                # Drop anything past the committed rows, left by a failed write
+                f.truncate(rows * np.dtype(dtype).itemsize)
+                np.asarray(batch[column], dtype=dtype).tofile(f)
+        self.commit_rows(rows + len(batch['game_id']))
+
+    async def flush(self):
+        if not self.pending():
+            return
+        batch, self.buffer = self.buffer, {column: [] for column in COLUMNS}
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            await asyncio.to_thread(self.write, batch)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except OSError as e:
+                LOGGER.error(f"Could not write analytics: {e}")
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def load(self):
+        # Memory-map the committed rows of every column
+        rows = self.committed_rows()
+        if rows == 0:
+            return {column: np.zeros(0, dtype=dtype) for column, dtype in COLUMNS.items()}
+        return {column: np.memmap(self.column_path(column), dtype=dtype, mode='r', shape=(rows,))
+                for column, dtype in COLUMNS.items()}
+
+    def query(self, value, by, where=None):
+        # Mean of a column grouped by one or more columns, e.g. query('jacks', ('seat',)).
+        # Returns [(group values, mean, rows)] for the groups that have rows.
+        data = self.load()
+        mask = None
+        for column, wanted in (where or {}).items():
+            selected = data[column] == wanted
+            mask = selected if mask is None else mask & selected
+
+        def select(column, dtype):
+            # Filter before widening, so only matching rows are converted
+            selected = data[column] if mask is None else data[column][mask]
+            return np.asarray(selected, dtype=dtype)
+
+        keys = [select(column, np.int64) for column in by]
+        values = select(value, np.float64)
+        if not len(values):
+            return []
+
+        # Flatten the group columns into one index so a single bincount does the grouping
+        offsets = [int(key.min()) for key in keys]
+        dims = [int(key.max()) - offset + 1 for key, offset in zip(keys, offsets)]
+        flat = np.ravel_multi_index([key - offset for key, offset in zip(keys, offsets)], dims)
+        counts = np.bincount(flat)
+        sums = np.bincount(flat, weights=values)
+
+        results = []
+        for index in np.flatnonzero(counts):
+            group = tuple(int(v) + offset for v, offset in zip(np.unravel_index(index, dims), offsets))
+            results.append((group, sums[index] / counts[index], int(counts[index])))
+        return results
+
+    def run_named(self, name, players=None):
+        value, by, _ = QUERIES[name]
+        where = {'players': players} if players else None
+        return self.query(value, by, where)
+
+
+def format_results(name, results):
+    value, by, description = QUERIES[name]
+    lines = [description, " | ".join(by) + f" | mean {value} | hands"]
+    for group, mean, count in results:
+        labels = [SUITS[v] if column == 'trump' else str(v) for column, v in zip(by, group)]
+        lines.append(" | ".join(labels) + f" | {mean:.3f} | {count}")
+    return "\n".join(lines)
+
+
+class HandRecorder:
+    # Game observer that appends a row per player when a hand completes
+
+    def __init__(self, store):
+        self.store = store
+
+    async def on_game_event(self, game, event, data):
+        if event != "hand_complete":
+            return
+
+        num_players = len(game.players)
+        trump_index, results, _ = game.hand_results[-1]
+        for seat, (player, (tricks_won, jacks_caught, hand_score)) in enumerate(zip(game.players, results)):
+            previous = game.players[(seat - 1) % num_players]
+            self.store.append(
+                game_id=self.store.game_key(game.game_id),
+                hand=game.round_number,
+                seat=seat,
+                players=num_players,
+                trump=trump_index,
+                tricks=tricks_won,
+                jacks=jacks_caught,
+                score=hand_score,
+                jacks_passed=sum(1 for card in game.passed_cards.get(player, []) if card.rank == "J"),
+                jacks_received=sum(1 for card in game.passed_cards.get(previous, []) if card.rank == "J"),
+            )
+
+        if self.store.pending() >= FLUSH_ROWS:
+            await self.store.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query recorded Jacks hands")
+    parser.add_argument('query', choices=sorted(QUERIES))
+    parser.add_argument('--players', type=int, choices=(3, 4), help="only games with this many players")
+    parser.add_argument('--dir', default=ANALYTICS_DIR, help="analytics directory")
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error("NumPy is required for analytics")
+
+    store = HandStore(args.dir)
+    print(format_results(args.query, store.run_named(args.query, args.players)))
+
+
+if __name__ == '__main__':
+    main()
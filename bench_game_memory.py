@@ -0,0 +1,39 @@
+import gc
+import sys
+import tracemalloc
+from types import SimpleNamespace
+
+from jacks import Game
+
+# Measures the memory held by each Game, e.g. `python bench_game_memory.py 10000`
+
+
+def fake_members(count, offset):
+    return [SimpleNamespace(id=offset + i, display_name=f"Player {offset + i}") for i in range(count)]
+
+
+def measure(num_games, players_per_game):
+    members = [fake_members(players_per_game, g * players_per_game) for g in range(num_games)]
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    games = []
+    for g, table in enumerate(members):
+        game = Game(table, client=None, channel_id=g)
+        for player in game.players:
+            player.dm_channel_id = player.user_id
+        games.append(game)
+
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (after - before) / num_games
+
+
+if __name__ == "__main__":
+    num_games = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    for players_per_game in (3, 4):
+        per_game = measure(num_games, players_per_game)
+        print(f"{players_per_game} players: {per_game:.0f} bytes per game "
+              f"({per_game * num_games / 1024 / 1024:.1f} MB for {num_games} games)")
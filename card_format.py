@@ -1,3 +1,8 @@
+# Suit and rank order define jacks.Card.index (suit * 12 + rank), which card
+# sprites, stored analytics rows and knowledge bitmasks all rely on
+SUITS = ["Hearts", "Clubs", "Diamonds", "Spades"]
+RANKS = ["3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A"]
+
 SUIT_EMOJIS = {
     "Hearts": "♥️",
     "Diamonds": "♦️",
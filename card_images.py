@@ -0,0 +1,158 @@
+import asyncio
+import io
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # Pillow is optional, text hands are used without it
+    Image = None
+
+from card_format import RANKS, SUITS
+
+# Optional image mode: hands, the current trick and passed cards drawn as one PNG.
+# The 48 cards are drawn once into a sprite atlas, and rendered images are kept in
+# a size-bounded LRU cache keyed by what is shown. Rendering runs in a small thread
+# pool so it never blocks the event loop.
+
+CARD_IMAGES = os.getenv('CARD_IMAGES', '0').lower() in ('1', 'true', 'yes')
+CACHE_BYTES = int(os.getenv('CARD_IMAGE_CACHE_BYTES', str(32 * 1024 * 1024)))
+
+CARD_WIDTH = 56
+CARD_HEIGHT = 80
+CARD_STEP = 36  # horizontal distance between overlapping cards in a hand
+TRICK_GAP = 8
+RAISE = 12  # how far highlighted cards stick up
+MARGIN = 6
+
+RED = (200, 30, 45)
+BLACK = (25, 25, 25)
+HIGHLIGHT = (240, 180, 20)
+BACKGROUND = (49, 51, 56)  # Discord's dark theme, so images need no transparency
+
+_atlas = None
+_sprites = None
+_palette = None
+_background_index = 0
+_highlight_index = 0
+_cache = OrderedDict()  # key -> PNG bytes
+_cache_size = 0
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="card-render")
+
+
+def enabled():
+    return CARD_IMAGES and Image is not None
+
+
+def _draw_suit(draw, suit, cx, cy, size, color):
+    # Suit symbols from simple shapes, so no emoji font is needed
+    r = size // 4
+    if suit == "Diamonds":
+        draw.polygon([(cx, cy - size // 2), (cx + size * 2 // 5, cy), (cx, cy + size // 2),
+                      (cx - size * 2 // 5, cy)], fill=color)
+    elif suit == "Hearts":
+        draw.ellipse([cx - 2 * r, cy - 2 * r, cx, cy], fill=color)
+        draw.ellipse([cx, cy - 2 * r, cx + 2 * r, cy], fill=color)
+        draw.polygon([(cx - 2 * r, cy - r + 1), (cx + 2 * r, cy - r + 1), (cx, cy + size // 2)], fill=color)
+    elif suit == "Spades":
+        draw.polygon([(cx, cy - size // 2), (cx + 2 * r, cy + r // 2), (cx - 2 * r, cy + r // 2)], fill=color)
+        draw.ellipse([cx - 2 * r, cy - r // 2, cx, cy + 3 * r // 2], fill=color)
+        draw.ellipse([cx, cy - r // 2, cx + 2 * r, cy + 3 * r // 2], fill=color)
+        draw.polygon([(cx, cy), (cx + r, cy + size // 2), (cx - r, cy + size // 2)], fill=color)
+    else:  # Clubs
+        draw.ellipse([cx - r, cy - 2 * r - r // 2, cx + r, cy - r // 2], fill=color)
+        draw.ellipse([cx - 2 * r - r // 2, cy - r, cx - r // 2, cy + r], fill=color)
+        draw.ellipse([cx + r // 2, cy - r, cx + 2 * r + r // 2, cy + r], fill=color)
+        draw.polygon([(cx, cy - r // 2), (cx + r, cy + size // 2), (cx - r, cy + size // 2)], fill=color)
+
+
+def _build_atlas():
+    # One 12x4 sheet with every card, cut into sprites indexed like jacks.Card.index.
+    # The sheet is reduced to a small palette: pasting palette sprites is a plain
+    # copy, and palette PNGs encode several times faster than RGB ones.
+    global _atlas, _sprites, _palette, _background_index, _highlight_index
+    height = CARD_HEIGHT * len(SUITS)
+    atlas = Image.new("RGB", (CARD_WIDTH * len(RANKS), height + 8), BACKGROUND)
+    draw = ImageDraw.Draw(atlas)
+    # A strip of the highlight colour keeps it in the palette
+    draw.rectangle([0, height, CARD_WIDTH * len(RANKS) // 2, height + 7], fill=HIGHLIGHT)
+    font = ImageFont.load_default()
+
+    for s, suit in enumerate(SUITS):
+        color = RED if suit in ("Hearts", "Diamonds") else BLACK
+        for r, rank in enumerate(RANKS):
+            x, y = r * CARD_WIDTH, s * CARD_HEIGHT
+            draw.rounded_rectangle([x, y, x + CARD_WIDTH - 1, y + CARD_HEIGHT - 1], radius=6,
+                                   fill=(255, 255, 255, 255), outline=(90, 90, 90, 255))
+            draw.text((x + 5, y + 4), rank, fill=color, font=font)
+            _draw_suit(draw, suit, x + 11, y + 25, 11, color)
+            _draw_suit(draw, suit, x + CARD_WIDTH // 2 + 4, y + CARD_HEIGHT // 2 + 8, 26, color)
+
+    atlas = atlas.quantize(colors=64)
+    _palette = atlas.getpalette()
+    _highlight_index = atlas.getpixel((0, height))
+    _background_index = atlas.getpixel((atlas.width - 1, height))
+    _sprites = [atlas.crop(((i % len(RANKS)) * CARD_WIDTH, (i // len(RANKS)) * CARD_HEIGHT,
+                            (i % len(RANKS) + 1) * CARD_WIDTH, (i // len(RANKS) + 1) * CARD_HEIGHT))
+                for i in range(len(SUITS) * len(RANKS))]
+    _atlas = atlas
+
+
+def _render_png(hand, trick, highlight):
+    # hand and trick are tuples of card indexes, highlight a frozenset of them
+    if _sprites is None:
+        _build_atlas()
+
+    hand_width = CARD_WIDTH + CARD_STEP * max(len(hand) - 1, 0) if hand else 0
+    trick_width = len(trick) * (CARD_WIDTH + TRICK_GAP) - TRICK_GAP if trick else 0
+    trick_height = CARD_HEIGHT + MARGIN if trick else 0
+    width = max(hand_width, trick_width, CARD_WIDTH) + 2 * MARGIN
+    height = trick_height + RAISE + CARD_HEIGHT + 2 * MARGIN
+
+    image = Image.new("P", (width, height), _background_index)
+    image.putpalette(_palette)
+
+    for i, index in enumerate(trick):
+        x = MARGIN + i * (CARD_WIDTH + TRICK_GAP)
+        image.paste(_sprites[index], (x, MARGIN))
+
+    draw = ImageDraw.Draw(image)
+    top = MARGIN + trick_height + RAISE
+    for i, index in enumerate(hand):
+        x = MARGIN + i * CARD_STEP
+        y = top - RAISE if index in highlight else top
+        image.paste(_sprites[index], (x, y))
+        if index in highlight:
+            draw.rounded_rectangle([x, y, x + CARD_WIDTH - 1, y + CARD_HEIGHT - 1], radius=6,
+                                   outline=_highlight_index, width=3)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def _cache_put(key, png):
+    global _cache_size
+    _cache[key] = png
+    _cache_size += len(png)
+    while _cache_size > CACHE_BYTES and _cache:
+        _, evicted = _cache.popitem(last=False)
+        _cache_size -= len(evicted)
+
+
+async def render(hand, trick=(), highlight=()):
+    # PNG bytes for a hand (in display order), the cards of the current trick and
+    # the cards to highlight. Cache lookups happen on the event loop thread, so the
+    # cache needs no locking; only misses go to the thread pool.
+    key = (tuple(card.index for card in hand),
+           tuple(card.index for card in trick),
+           frozenset(card.index for card in highlight))
+    png = _cache.get(key)
+    if png is not None:
+        _cache.move_to_end(key)
+        return png
+
+    png = await asyncio.get_running_loop().run_in_executor(_executor, _render_png, *key)
+    _cache_put(key, png)
+    return png
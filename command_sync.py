@@ -0,0 +1,55 @@
+import hashlib
+import json
+import logging
+import os
+
+import discord
+
+LOGGER = logging.getLogger(__name__)
+
+HASH_FILE = '.command_sync.json'
+
+
+def tree_hash(tree, guild=None):
+    # Hash the payload Discord would receive for this scope (names, options, descriptions...)
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda command: (command.get('type', 1), command['name']))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_hashes(path=HASH_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_hashes(hashes, path=HASH_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(hashes, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+async def sync_commands(tree, guild_id=None, force=False, path=HASH_FILE):
+    # Sync the command tree only if it changed since the last successful sync.
+    # With a guild id, global commands are copied to that guild and synced there
+    # instead, which applies instantly and is handy during development.
+    guild = discord.Object(id=guild_id) if guild_id else None
+    if guild is not None:
+        tree.copy_global_to(guild=guild)
+
+    scope = str(guild_id) if guild_id else 'global'
+    digest = tree_hash(tree, guild)
+    hashes = load_hashes(path)
+
+    if not force and hashes.get(scope) == digest:
+        LOGGER.info(f"Command tree unchanged for {scope}, skipping sync")
+        return None
+
+    synced = await tree.sync(guild=guild)
+    hashes[scope] = digest
+    save_hashes(hashes, path)
+    LOGGER.info(f"Synced {len(synced)} commands to {scope}")
+    return synced
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+import random
+
+try:
+    import numpy as np
+except ImportError:  # deals are shuffled one at a time without NumPy
+    np = None
+
+from card_format import RANKS, SUITS
+
+LOGGER = logging.getLogger(__name__)
+
+# Where games get their deals from. A deal is the order of the 48 cards (by
+# jacks.Card.index) stored as 48 bytes, and hands are consecutive slices of it.
+# DealPool keeps a block of deals generated ahead of time, so starting a game or a
+# hand only slices the next 48 bytes off it; the next block is generated in a thread
+# once half of the current one is used. DealStream gives the deals of one seed in a
+# fixed order, so every table of a duplicate tournament can be dealt the same hands.
+# Games log each deal they play as hex and keep it in hand_results, and DealList
+# deals those again to replay or share a game.
+
+DECK_SIZE = len(SUITS) * len(RANKS)
+POOL_SIZE = int(os.getenv('DEAL_POOL_SIZE', '4096'))  # deals per block
+
+
+def generate(count, seed=None):
+    # count random deals as one bytes object
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        decks = np.tile(np.arange(DECK_SIZE, dtype=np.uint8), (count, 1))
+        return rng.permuted(decks, axis=1).tobytes()
+
+    rng = random.Random(seed)
+    deals = bytearray()
+    order = list(range(DECK_SIZE))
+    for _ in range(count):
+        rng.shuffle(order)
+        deals.extend(order)
+    return bytes(deals)
+
+
+class DealStream:
+    # The deals of one seed, in order. Uses random.Random so a seed gives the same
+    # deals with or without NumPy.
+
+    def __init__(self, seed=None):
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.rng = random.Random(self.seed)
+
+    def next_deal(self):
+        order = list(range(DECK_SIZE))
+        self.rng.shuffle(order)
+        return bytes(order)
+
+
+class DealList:
+    # Given deals in order, e.g. DealList.from_hex(["0a1f...", ...]) from a game's log.
+    # Starts again from the first once they run out.
+
+    def __init__(self, deals):
+        self.deals = [bytes(deal) for deal in deals]
+        self.position = 0
+
+    @classmethod
+    def from_hex(cls, deals):
+        return cls(bytes.fromhex(deal) for deal in deals)
+
+    def next_deal(self):
+        deal = self.deals[self.position % len(self.deals)]
+        self.position += 1
+        return deal
+
+
+class DealPool:
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self.block = b""  # deals being handed out
+        self.position = 0  # byte offset of the next deal in block
+        self.spare = None  # next block, once generated
+        self.refilling = False
+
+    def remaining(self):
+        return (len(self.block) - self.position) // DECK_SIZE
+
+    def next_deal(self):
+        if self.position >= len(self.block):
+            if self.spare is None:
+                # Ran dry before the next block was ready, deal this one directly
+                self.refill()
+                return generate(1)
+            self.block, self.spare, self.position = self.spare, None, 0
+
+        deal = self.block[self.position:self.position + DECK_SIZE]
+        self.position += DECK_SIZE
+        if self.spare is None and self.remaining() < self.size // 2:
+            self.refill()
+        return deal
+
+    def refill(self):
+        if self.refilling:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:  # no event loop, e.g. in simulations
+            self.spare = generate(self.size)
+            return
+        self.refilling = True
+        loop.run_in_executor(None, generate, self.size).add_done_callback(self.refilled)
+
+    def refilled(self, future):
+        self.refilling = False
+        try:
+            self.spare = future.result()
+        except Exception as e:
+            LOGGER.error(f"Could not generate deals: {e}")
+
+    def start(self):
+        # Fill the pool in the background before the first game needs it
+        if not self.block and self.spare is None:
+            self.refill()
@@ -0,0 +1,604 @@
+import asyncio
+import itertools
+import logging
+import os
+from typing import Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import jacks
+import state
+from analytics import HandRecorder
+from deals import DealStream
+from knowledge import CardTracker, format_hint
+from leaderboard import GLOBAL, StatsRecorder
+from spectate import SpectatorBroadcast
+from tournament import Tournament, table_sizes
+
+LOGGER = logging.getLogger(__name__)
+
+LOBBY_TTL = int(os.getenv('LOBBY_TTL', '1800'))  # seconds a lobby may sit idle
+GAME_TTL = int(os.getenv('GAME_TTL', '900'))  # seconds a game may go without a play
+# "guild" matches players within a server, "global" across every server on this worker
+MATCHMAKING_SCOPE = os.getenv('MATCHMAKING_SCOPE', 'guild')
+
+_queue_tables = itertools.count(1)
+
+
+class JacksCog(commands.Cog):
+    # Slash commands and game management. Loaded as an extension so the game code
+    # can be reloaded without restarting the bot; all live state is in state.py.
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        # Rebind live lobbies and games (carried over from a reload) to this cog
+        for channel_id in state.active_pregames:
+            state.lifecycle.rebind(("lobby", channel_id), self.expire_pregame)
+        for game in state.active_games.values():
+            game.observers.append(self.on_game_event)
+            state.lifecycle.rebind(("game", game.game_id), self.expire_game)
+
+    async def cog_unload(self):
+        for game in state.active_games.values():
+            if self.on_game_event in game.observers:
+                game.observers.remove(self.on_game_event)
+
+    def lobby_key(self, pregame):
+        # Directory key the lobby's players are claimed under by /ready
+        return f"lobby:{pregame.interaction.id}"
+
+    async def release_lobby(self, pregame):
+        # Release the lobby's players in case /ready claimed them before the lobby closed
+        await state.shard_context.release_players([player.id for player in pregame.players],
+                                                  self.lobby_key(pregame))
+
+    async def expire_pregame(self, pregame):
+        channel_id = pregame.interaction.channel_id
+        if state.active_pregames.get(channel_id) is pregame:
+            del state.active_pregames[channel_id]
+        await self.release_lobby(pregame)
+        await pregame.disable_lobby("Jacks - EXPIRED",
+                                    f"~~{pregame.master.mention} has started a Jacks game!~~\n"
+                                    f"**This lobby was closed after being idle.**")
+
+    async def start_game(self, members, channel_id, guild_id, game_key, seed=None, names=None):
+        # Start a game on this worker. The players must already be claimed under game_key.
+        # Games with a seed get that seed's deals, others take theirs from the pool.
+        # names overrides the players' names, e.g. server nicknames sent by another worker.
+        deals = DealStream(seed) if seed is not None else state.deal_pool
+        game = jacks.Game(members, self.bot, channel_id, guild_id, deals)
+        for player, name in zip(game.players, names or ()):
+            player.name = name
+        state.active_games[game.game_id] = game
+        state.game_claims[game.game_id] = (game_key, [member.id for member in members])
+        state.games_by_channel.setdefault(channel_id, {})[game.game_id] = None
+        game.observers.append(self.on_game_event)
+        if state.hand_store is not None:
+            game.observers.append(HandRecorder(state.hand_store).on_game_event)
+        if state.stats_store is not None:
+            game.observers.append(StatsRecorder(state.stats_store).on_game_event)
+        tracker = CardTracker(len(game.players))
+        state.trackers[game.game_id] = tracker
+        game.observers.append(tracker.on_game_event)
+        for member in members:
+            state.player_games[member.id] = game.game_id
+        state.lifecycle.track(("game", game.game_id), game, GAME_TTL, self.expire_game)
+
+        await game.open_dm_channels(members)
+        await game.send_hands_to_players()
+        await game.start_passing_phase()
+        return game
+
+    async def launch_game(self, members, channel_id, guild_id, game_key):
+        # Start the game here, or on the worker that owns games when sharded
+        if state.shard_context.owns_games():
+            await self.start_game(members, channel_id, guild_id, game_key)
+        else:
+            await state.shard_context.forward(state.shard_context.router.worker_for_games(), {
+                'type': 'start_game',
+                'player_ids': [member.id for member in members],
+                'names': [member.display_name for member in members],
+                'channel_id': channel_id,
+                'guild_id': guild_id,
+                'game_key': game_key
+            })
+
+    async def seat_queued_table(self, entries, channel_id, guild_id):
+        # Claim and start one table formed by the matchmaking queue. Players who
+        # got into another game in the meantime are dropped, the rest are requeued.
+        queue = state.matchmaking_queue
+        game_key = f"queue:{state.shard_context.worker_index}:{next(_queue_tables)}"
+        members = [entry.member for entry in entries]
+        busy = await state.shard_context.claim_players([member.id for member in members], game_key)
+        if busy:
+            for entry in entries:
+                if entry.member.id not in busy:
+                    queue.requeue(entry)
+            return None
+
+        await self.launch_game(members, channel_id, guild_id, game_key)
+        return members
+
+    async def queue_rating(self, user_id, scope):
+        # Matchmaking rating: the player's average score per hand in the queue's scope.
+        # None for players without stats yet, who are matched with each other.
+        if state.matchmaking_queue.rating_band is None or state.stats_store is None:
+            return None
+        stats = await state.stats_store.player_stats(scope or GLOBAL, user_id)
+        return stats.average if stats is not None and stats.hands else None
+
+    async def seat_queued_tables(self, bucket, channel_id, guild_id):
+        # Start every table a bucket can seat. Tables that lost players to another
+        # game requeue the rest, who may fill a table again, so keep going until
+        # the bucket has no full table left. Returns the members of each started table.
+        started = []
+        tables = state.matchmaking_queue.pop_tables(bucket)
+        while tables:
+            seated = await asyncio.gather(*(self.seat_queued_table(entries, channel_id, guild_id)
+                                            for entries in tables))
+            started.extend(members for members in seated if members)
+            if all(seated):
+                break
+            tables = state.matchmaking_queue.pop_tables(bucket)
+        return started
+
+    async def start_tournament_table(self, members, channel_id, guild_id, game_key, seed=None):
+        busy = await state.shard_context.claim_players([member.id for member in members], game_key)
+        if busy:
+            LOGGER.warning(f"Tournament table {game_key} not started, {busy} already in a game")
+            return None
+        return await self.start_game(members, channel_id, guild_id, game_key, seed)
+
+    async def release_game(self, game):
+        state.active_games.pop(game.game_id, None)
+        state.lifecycle.forget(("game", game.game_id))
+        channel_games = state.games_by_channel.get(game.channel_id, {})
+        channel_games.pop(game.game_id, None)
+        if not channel_games:
+            state.games_by_channel.pop(game.channel_id, None)
+        game.close()
+        if game.game_phase == "abandoned":
+            await game.notify("abandoned")
+        state.broadcasts.pop(game.game_id, None)
+        state.trackers.pop(game.game_id, None)
+        for player in game.players:
+            if state.player_games.get(player.user_id) == game.game_id:
+                del state.player_games[player.user_id]
+        if game.game_id in state.game_claims:
+            game_key, user_ids = state.game_claims.pop(game.game_id)
+            await state.shard_context.release_players(user_ids, game_key)
+        LOGGER.info(f"Released game {game.game_id} ({game.game_phase})")
+
+    async def on_game_event(self, game, event, data):
+        if event == "finished":
+            await self.release_game(game)
+
+    async def expire_game(self, game):
+        await self.release_game(game)
+
+    async def handle_forwarded(self, message):
+        # Game starts forwarded by other workers (see sharding.py)
+        try:
+            if message['type'] == 'start_game':
+                members = [self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+                           for user_id in message['player_ids']]
+                await self.start_game(members, message['channel_id'], message['guild_id'],
+                                      message['game_key'], names=message['names'])
+        except Exception as e:
+            LOGGER.error(f"Could not handle forwarded {message.get('type')}: {e}")
+            await state.shard_context.release_players(message.get('player_ids', []), message.get('game_key'))
+
+    @app_commands.command(name="help")
+    async def show_help(self, interaction: discord.Interaction):
+        embed = discord.Embed(
+            title="Help",
+            color=discord.Color.orange()
+        ).add_field(
+            name="Learn How to Play",
+            value="https://www.tiktok.com/@jacks.master/video/7079103590769478917",
+                    inline=False
+        ).add_field(name="Commands",
+                    value="**/jacks** - create a new lobby\n"
+                          "**/cancelgame** - close the lobby\n"
+                          "**/remove** `@user` - kick a player from the lobby\n"
+                          "**/leavegame** - leave a lobby\n"
+                          "**/ready** - start the game\n"
+                          "**/queue** - find a table with other waiting players\n"
+                          "**/unqueue** - leave the queue\n"
+                          "**/spectate** - watch a game running in this channel\n"
+                          "**/hint** - odds of where the jacks are in your game\n"
+                          "**/leaderboard** - the best players here or everywhere\n"
+                          "**/stats** `@user` - a player's record\n"
+                          "**/tournament** `create`/`join`/`leave`/`start` - run a tournament",
+                    inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="jacks")
+    async def create_lobby(self, interaction: discord.Interaction):
+        channel_id = interaction.channel_id
+
+        # Check if there's already a game in this channel
+        if channel_id in state.active_pregames:
+            await interaction.response.send_message("There's already a Jacks game in this channel!", ephemeral=True)
+            return
+
+        pregame = jacks.PreGame(interaction)
+        state.active_pregames[channel_id] = pregame
+        state.lifecycle.track(("lobby", channel_id), pregame, LOBBY_TTL, self.expire_pregame)
+        await pregame.create_lobby(interaction.user)
+
+    @app_commands.command(name="remove")
+    @app_commands.describe(player="The player to kick from the game")
+    async def kick_player(self, interaction: discord.Interaction, player: discord.Member):
+        channel_id = interaction.channel_id
+
+        # Check if there's a game in this channel
+        if channel_id not in state.active_pregames:
+            await interaction.response.send_message("No active Jacks game in this channel!", ephemeral=True)
+            return
+
+        pregame = state.active_pregames[channel_id]
+
+        # Check if the user trying to kick is the game master
+        if interaction.user != pregame.master:
+            await interaction.response.send_message("Only the game master can kick players!", ephemeral=True)
+            return
+
+        # Check if the player is actually in the game
+        if player not in pregame.players:
+            await interaction.response.send_message(f"{player.mention} is not in the game!", ephemeral=True)
+            return
+
+        # Don't allow kicking yourself (the master)
+        if player == pregame.master:
+            await interaction.response.send_message("You cannot kick yourself! Use a different command to cancel the game.",
+                                                    ephemeral=True)
+            return
+
+        # Remove the player
+        pregame.players.remove(player)
+        pregame.touch()
+        LOGGER.info(f"{interaction.user} kicked {player} from the game in {interaction.channel.name}")
+
+        await interaction.response.send_message(
+            f"{player.mention} has been kicked from the game by {interaction.user.mention}.")
+
+    @app_commands.command(name="leavegame")
+    async def leave_game(self, interaction: discord.Interaction):
+        channel_id = interaction.channel_id
+
+        # Check if there's a game in this channel
+        if channel_id not in state.active_pregames:
+            await interaction.response.send_message("No active Jacks game in this channel!", ephemeral=True)
+            return
+
+        pregame = state.active_pregames[channel_id]
+
+        # Check if the player is in the game
+        if interaction.user not in pregame.players:
+            # Check if they're the master
+            if interaction.user == pregame.master:
+                await interaction.response.send_message("As the game master, use `/cancel` to cancel the game instead.",
+                                                        ephemeral=True)
+            else:
+                await interaction.response.send_message("You're not in this game!", ephemeral=True)
+            return
+
+        # Remove the player
+        pregame.players.remove(interaction.user)
+        pregame.touch()
+        LOGGER.info(f"{interaction.user} left the game in {interaction.channel.name}")
+
+        await interaction.response.send_message(f"{interaction.user.mention} has left the game.")
+
+    @app_commands.command(name="cancelgame")
+    async def cancel_game(self, interaction: discord.Interaction):
+        channel_id = interaction.channel_id
+
+        # Check if there's a game in this channel
+        if channel_id not in state.active_pregames:
+            await interaction.response.send_message("No active Jacks game in this channel!", ephemeral=True)
+            return
+
+        pregame = state.active_pregames[channel_id]
+
+        # Check if the user is the game master
+        if interaction.user != pregame.master:
+            await interaction.response.send_message("Only the game master can cancel the game!", ephemeral=True)
+            return
+
+        await pregame.disable_lobby("Jacks - CANCELLED",
+                                    f"~~{pregame.master.mention} has started a Jacks game!~~\n**This game has been cancelled.**")
+
+        # Remove the game
+        del state.active_pregames[channel_id]
+        state.lifecycle.forget(("lobby", channel_id))
+        await self.release_lobby(pregame)
+
+        LOGGER.info(f"{interaction.user} cancelled the game in {interaction.channel.name}")
+
+        await interaction.response.send_message(f"The Jacks game has been cancelled by {interaction.user.mention}.")
+
+    @app_commands.command(name="ready")
+    async def ready(self, interaction: discord.Interaction):
+        channel_id = interaction.channel_id
+
+        if channel_id not in state.active_pregames:
+            await interaction.response.send_message("No active Jacks game in this channel!", ephemeral=True)
+            return
+
+        pregame = state.active_pregames[channel_id]
+
+        if interaction.user != pregame.master:
+            await interaction.response.send_message(f"Only {pregame.master.mention} can start the game.", ephemeral=True)
+            return
+
+        if len(pregame.players) < 3 or len(pregame.players) > 4:
+            await interaction.response.send_message("Jacks can only be played with 3 or 4 players.", ephemeral=True)
+            return
+
+        # Players may be in a game on another worker, so check the shared directory
+        game_key = self.lobby_key(pregame)
+        player_ids = [player.id for player in pregame.players]
+        busy = await state.shard_context.claim_players(player_ids, game_key)
+        if busy:
+            mentions = ", ".join(f"<@{user_id}>" for user_id in busy)
+            await interaction.response.send_message(f"{mentions} already in another game.", ephemeral=True)
+            return
+
+        if state.active_pregames.get(channel_id) is not pregame:
+            # Cancelled or expired while the players were being claimed
+            await state.shard_context.release_players(player_ids, game_key)
+            await interaction.response.send_message("This lobby has been closed.", ephemeral=True)
+            return
+
+        del state.active_pregames[channel_id]
+        state.lifecycle.forget(("lobby", channel_id))
+
+        # Answer first: the interaction has to be answered within 3 seconds, whatever happens below
+        await interaction.response.send_message(f"Game started! Check your DMs for your hand.")
+
+        # From here the claim is only released when the game ends, so release it if the game never starts
+        try:
+            await pregame.delete_lobby()
+
+            #Start game
+            await self.launch_game(pregame.players, channel_id, interaction.guild_id, game_key)
+        except Exception:
+            await state.shard_context.release_players(player_ids, game_key)
+            try:
+                await interaction.followup.send("The game could not be started, try /jacks again.")
+            except discord.HTTPException:
+                pass
+            raise
+
+    @app_commands.command(name="queue")
+    @app_commands.describe(players="Preferred table size")
+    async def join_queue(self, interaction: discord.Interaction,
+                         players: Optional[app_commands.Range[int, 3, 4]] = 4):
+        queue = state.matchmaking_queue
+
+        if await state.shard_context.lookup_player(interaction.user.id):
+            await interaction.response.send_message("You're already in a game!", ephemeral=True)
+            return
+
+        scope = interaction.guild_id if MATCHMAKING_SCOPE == 'guild' else None
+        rating = await self.queue_rating(interaction.user.id, scope)
+        bucket = queue.join(interaction.user, scope, players, rating)
+        LOGGER.info(f"{interaction.user} joined the {players}-player queue ({queue.waiting(bucket)} waiting)")
+
+        if queue.waiting(bucket) < players:
+            await interaction.response.send_message(
+                f"You're in the queue for a {players}-player table ({queue.waiting(bucket)}/{players} waiting). "
+                f"Use /unqueue to leave.", ephemeral=True)
+            return
+
+        # Claiming and starting can take a while with several tables, so answer once they're seated
+        await interaction.response.defer(thinking=True)
+        started = await self.seat_queued_tables(bucket, interaction.channel_id, interaction.guild_id)
+        if not started:
+            await interaction.followup.send(
+                f"Some players were already in another game, so no table could start. "
+                f"Everyone else is still in the queue ({queue.waiting(bucket)}/{players} waiting).")
+            return
+
+        for members in started:
+            mentions = ", ".join(member.mention for member in members)
+            await interaction.followup.send(f"New table: {mentions}. Check your DMs for your hand.")
+
+    @app_commands.command(name="spectate")
+    @app_commands.describe(game="Game number, if more than one game is running here")
+    async def spectate(self, interaction: discord.Interaction, game: Optional[int] = None):
+        channel_games = state.games_by_channel.get(interaction.channel_id)
+        if not channel_games:
+            await interaction.response.send_message("No running Jacks game in this channel to watch!",
+                                                    ephemeral=True)
+            return
+
+        if game is None:
+            if len(channel_games) > 1:
+                numbers = ", ".join(str(game_id) for game_id in channel_games)
+                await interaction.response.send_message(f"Several games are running here, pick one of: {numbers}",
+                                                        ephemeral=True)
+                return
+            game = next(iter(channel_games))
+        elif game not in channel_games:
+            await interaction.response.send_message(f"Game {game} isn't running in this channel!", ephemeral=True)
+            return
+
+        if interaction.user.id in state.game_claims[game][1]:
+            await interaction.response.send_message("You can't spectate your own game!", ephemeral=True)
+            return
+
+        # All spectators of a game share one broadcast message
+        broadcast = state.broadcasts.get(game)
+        if broadcast is None:
+            running_game = state.active_games[game]
+            broadcast = SpectatorBroadcast(running_game, interaction.channel)
+            running_game.observers.append(broadcast.on_game_event)
+            state.broadcasts[game] = broadcast
+        broadcast.add(interaction.user.id)
+        broadcast.schedule()
+
+        LOGGER.info(f"{interaction.user} is spectating game {game}")
+        await interaction.response.send_message("You're now spectating. Updates will appear in this channel.",
+                                                ephemeral=True)
+
+    @app_commands.command(name="hint")
+    async def hint(self, interaction: discord.Interaction):
+        game = state.active_games.get(state.player_games.get(interaction.user.id))
+        if game is None:
+            await interaction.response.send_message("You're not in a game!", ephemeral=True)
+            return
+        if game.game_phase != "playing":
+            await interaction.response.send_message("Hints are available once the cards have been passed.",
+                                                    ephemeral=True)
+            return
+
+        player = next(player for player in game.players if player.user_id == interaction.user.id)
+        embed = discord.Embed(
+            title="Where are the jacks?",
+            description=format_hint(state.trackers[game.game_id], game, player),
+            color=discord.Color.dark_gold()
+        )
+        embed.set_footer(text="Based on the cards played, players who couldn't follow suit and your pass")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="leaderboard")
+    @app_commands.describe(scope="This server's players or everyone's")
+    @app_commands.choices(scope=[app_commands.Choice(name="This server", value="guild"),
+                                 app_commands.Choice(name="Global", value="global")])
+    async def show_leaderboard(self, interaction: discord.Interaction,
+                               scope: Optional[app_commands.Choice[str]] = None):
+        if state.stats_store is None:
+            await interaction.response.send_message("Stats are not enabled.", ephemeral=True)
+            return
+
+        is_global = interaction.guild_id is None or (scope is not None and scope.value == "global")
+        rows = await state.stats_store.leaderboard(GLOBAL if is_global else interaction.guild_id)
+        if not rows:
+            await interaction.response.send_message("No games have been recorded yet!", ephemeral=True)
+            return
+
+        lines = [f"{i}. **{row.name}**: {row.score} pts ({row.hands} hands, {row.average:+.2f} per hand)"
+                 for i, row in enumerate(rows, start=1)]
+        embed = discord.Embed(
+            title="Jacks Leaderboard" + (" - Global" if is_global else ""),
+            description="\n".join(lines),
+            color=discord.Color.gold()
+        )
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="stats")
+    @app_commands.describe(player="Whose stats to show", scope="This server's games or every game")
+    @app_commands.choices(scope=[app_commands.Choice(name="This server", value="guild"),
+                                 app_commands.Choice(name="Global", value="global")])
+    async def show_stats(self, interaction: discord.Interaction, player: Optional[discord.User] = None,
+                         scope: Optional[app_commands.Choice[str]] = None):
+        if state.stats_store is None:
+            await interaction.response.send_message("Stats are not enabled.", ephemeral=True)
+            return
+
+        player = player or interaction.user
+        is_global = interaction.guild_id is None or (scope is not None and scope.value == "global")
+        stats = await state.stats_store.player_stats(GLOBAL if is_global else interaction.guild_id, player.id)
+        if stats is None:
+            await interaction.response.send_message(f"{player.display_name} hasn't played any recorded games.",
+                                                    ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title=f"Jacks Stats - {player.display_name}" + (" (Global)" if is_global else ""),
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Games", value=str(stats.games))
+        embed.add_field(name="Hands", value=str(stats.hands))
+        embed.add_field(name="Tricks", value=str(stats.tricks))
+        embed.add_field(name="Jacks Taken", value=str(stats.jacks))
+        embed.add_field(name="Total Score", value=str(stats.score))
+        embed.add_field(name="Average Score", value=f"{stats.average:+.2f} per hand")
+        await interaction.response.send_message(embed=embed)
+
+    tournament = app_commands.Group(name="tournament", description="Run a tournament in this channel")
+
+    @tournament.command(name="create")
+    @app_commands.describe(rounds="Number of rounds to play",
+                           duplicate="Deal every table of a round the same cards")
+    async def create_tournament(self, interaction: discord.Interaction,
+                                rounds: app_commands.Range[int, 1, 10] = 3, duplicate: bool = False):
+        channel_id = interaction.channel_id
+        existing = state.tournaments.get(channel_id)
+        if existing and existing.phase != "finished":
+            await interaction.response.send_message("There's already a tournament in this channel!", ephemeral=True)
+            return
+
+        # Every table of a tournament has to run on this worker to report back
+        if not state.shard_context.owns_games():
+            await interaction.response.send_message("Tournaments can't be run from this server right now.",
+                                                    ephemeral=True)
+            return
+
+        state.tournaments[channel_id] = Tournament(self.bot, interaction.user, interaction.channel, rounds, duplicate)
+        LOGGER.info(f"{interaction.user} created a {rounds} round tournament in {interaction.channel.name}")
+        await interaction.response.send_message(
+            f"{interaction.user.mention} has started a {rounds} round Jacks tournament! "
+            f"Use `/tournament join` to sign up.")
+
+    @tournament.command(name="join")
+    async def join_tournament(self, interaction: discord.Interaction):
+        tournament = state.tournaments.get(interaction.channel_id)
+        if tournament is None or tournament.phase != "signup":
+            await interaction.response.send_message("No tournament is taking sign-ups in this channel!",
+                                                    ephemeral=True)
+            return
+        if interaction.user.id in tournament.members:
+            await interaction.response.send_message("You are already signed up", ephemeral=True)
+            return
+
+        tournament.join(interaction.user)
+        await interaction.response.send_message(
+            f"{interaction.user.mention} has joined the tournament ({len(tournament.members)} players).")
+
+    @tournament.command(name="leave")
+    async def leave_tournament(self, interaction: discord.Interaction):
+        tournament = state.tournaments.get(interaction.channel_id)
+        if tournament is None or interaction.user.id not in tournament.members:
+            await interaction.response.send_message("You're not in a tournament here!", ephemeral=True)
+            return
+
+        # Once running, leaving takes effect from the next round
+        tournament.leave(interaction.user.id)
+        await interaction.response.send_message(f"{interaction.user.mention} has left the tournament.")
+
+    @tournament.command(name="start")
+    async def start_tournament(self, interaction: discord.Interaction):
+        tournament = state.tournaments.get(interaction.channel_id)
+        if tournament is None or tournament.phase != "signup":
+            await interaction.response.send_message("No tournament is taking sign-ups in this channel!",
+                                                    ephemeral=True)
+            return
+        if interaction.user.id != tournament.organiser_id:
+            await interaction.response.send_message("Only the organiser can start the tournament.", ephemeral=True)
+            return
+        if table_sizes(len(tournament.members)) is None:
+            await interaction.response.send_message(
+                "A tournament needs 3, 4 or at least 6 players to fill tables of 3-4.", ephemeral=True)
+            return
+
+        await interaction.response.send_message(
+            f"The tournament has started with {len(tournament.members)} players! Check your DMs for your hand.")
+        await tournament.start_round()
+
+    @app_commands.command(name="unqueue")
+    async def leave_queue(self, interaction: discord.Interaction):
+        if state.matchmaking_queue.leave(interaction.user.id):
+            await interaction.response.send_message("You have left the queue.", ephemeral=True)
+        else:
+            await interaction.response.send_message("You're not in the queue!", ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(JacksCog(bot))
@@ -1,17 +1,32 @@
+import io
+import itertools
 import logging
-import random
+import os
+import time
+import weakref
+import card_images
 import views
+from deals import DealStream
 from card_format import *
 
 import discord
 from discord import Member
 
-SUITS = ["Hearts", "Clubs", "Diamonds", "Spades"]
-RANKS = ["3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A"]
-
 LOGGER = logging.getLogger(__name__)
 
+# A match is played until MATCH_HANDS hands have been played (0 for no limit) or
+# someone reaches MATCH_TARGET_SCORE points (0 to disable), whichever comes first
+MATCH_HANDS = int(os.getenv('MATCH_HANDS', '4'))
+MATCH_TARGET_SCORE = int(os.getenv('MATCH_TARGET_SCORE', '0'))
+
+# Deals for games not given their own source, e.g. in simulations
+DEFAULT_DEALS = DealStream()
+
 class Card:
+    # Cards are flyweights: make_deck() hands out the same 48 instances every time,
+    # so hands and tricks only hold references.
+    __slots__ = ('suit', 'rank', 'index', 'mask')
+
     # Define the order for suits and ranks
     SUIT_ORDER = {'Hearts': 0, 'Clubs': 1, 'Diamonds': 2, 'Spades': 3}
     RANK_ORDER = {'3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8,
@@ -20,6 +35,8 @@ class Card:
     def __init__(self, suit, rank):
         self.suit = suit
         self.rank = rank
+        self.index = SUITS.index(suit) * len(RANKS) + RANKS.index(rank)  # 0-47
+        self.mask = 1 << self.index
 
     def __repr__(self):
         return f"{self.rank}{self.suit[0]}"  # e.g. "10H", "QS"
@@ -31,19 +48,29 @@ class Card:
         return self.RANK_ORDER[self.rank] < self.RANK_ORDER[other.rank]
 
     def __eq__(self, other):
-        return self.rank == other.rank and self.suit == other.suit
+        return self.index == other.index
+
+    def __hash__(self):
+        return self.index
+
+
+CARDS = [Card(suit, rank) for suit in SUITS for rank in RANKS]
 
 
 def make_deck():
-    return [Card(suit, rank) for suit in SUITS for rank in RANKS]
+    return list(CARDS)
 
 class Player:
-    def __init__(self, name, discord_user=None):
+    __slots__ = ('name', 'user_id', 'dm_channel_id', 'hand', 'tricks_won', 'jacks_caught', 'score')
+
+    def __init__(self, name, user_id=None):
         self.name = name
-        self.discord_user = discord_user
-        self.hand = []
-        self.tricks = []
-        self.score = 0
+        self.user_id = user_id
+        self.dm_channel_id = None
+        self.hand = []  # reused for every hand of the match
+        self.tricks_won = 0  # this hand, counted as tricks are captured
+        self.jacks_caught = 0  # this hand
+        self.score = 0  # match total
 
     def __repr__(self):
         return f"{self.name} (Score: {self.score})"
@@ -56,23 +83,77 @@ class PreGame:
         self.master = interaction.user
         self.ready = False
         self.players = []
-        self.lobby_message = None
+        # The lobby message is reached through the bot's token rather than the
+        # interaction's, which expires after 15 minutes
+        self.lobby_channel_id = None
+        self.lobby_message_id = None
+        self.last_activity = time.monotonic()
 
+    def touch(self):
+        self.last_activity = time.monotonic()
 
     async def create_lobby(self, master: Member):
         LOGGER.info(f"Creating lobby for {master} in {self.interaction.channel.name}")
         embed = discord.Embed(title="Jacks",
                               description=f"{master.mention} has started a Jacks game!\nThe game will begin once 3-4 players have joined and {master.mention} uses /ready")
         await self.interaction.response.send_message(embed=embed, view=views.CreateLobbyView(self))
-        self.lobby_message = await self.interaction.original_response()
+        lobby_message = await self.interaction.original_response()
+        self.lobby_channel_id = lobby_message.channel.id
+        self.lobby_message_id = lobby_message.id
+
+    def get_lobby_message(self):
+        if self.lobby_message_id is None:
+            return None
+        channel = self.interaction.client.get_partial_messageable(self.lobby_channel_id)
+        return channel.get_partial_message(self.lobby_message_id)
+
+    async def delete_lobby(self):
+        lobby_message = self.get_lobby_message()
+        if lobby_message is None:
+            return
+        try:
+            await lobby_message.delete()
+        except discord.HTTPException as e:
+            LOGGER.warning(f"Could not delete lobby message {self.lobby_message_id}: {e}")
+
+    async def disable_lobby(self, title, description):
+        # Replace the lobby embed and disable the join button
+        lobby_message = self.get_lobby_message()
+        if lobby_message is None:
+            return
+        disabled_view = views.CreateLobbyView(self)
+        for item in disabled_view.children:
+            item.disabled = True
+
+        embed = discord.Embed(title=title, description=description)
+        try:
+            await lobby_message.edit(embed=embed, view=disabled_view)
+        except discord.HTTPException as e:
+            LOGGER.warning(f"Could not disable lobby message {self.lobby_message_id}: {e}")
+        disabled_view.stop()
 
 
 class Game:
-    def __init__(self, players: list):
-        self.discord_players = players
-        self.players = [Player(user.display_name, user) for user in players]
+    # Only ids of Discord objects are kept, so a game stays small no matter how
+    # many are running. Messages are reached through partial objects when needed.
+    __slots__ = ('game_id', 'client', 'channel_id', 'guild_id', 'players', 'deck', 'deals', 'deal', 'trump_index', 'passed_cards',
+                 'current_trick', 'current_player_index', 'lead_player_index', 'game_phase',
+                 'round_number', 'last_trick_messages', 'live_trick_messages', 'last_activity', 'views',
+                 'observers', 'max_hands', 'target_score', 'hand_results', 'standings')
+
+    _ids = itertools.count(1)
+
+    def __init__(self, players: list, client, channel_id=None, guild_id=None, deals=None, max_hands=MATCH_HANDS,
+                 target_score=MATCH_TARGET_SCORE):
+        self.game_id = next(Game._ids)
+        self.client = client
+        self.channel_id = channel_id
+        self.guild_id = guild_id  # for per-guild stats
+        self.players = [Player(user.display_name, user.id) for user in players]
         self.deck = make_deck()
-        self.trump_index = 0  # start with Hearts as trump
+        self.deals = deals or DEFAULT_DEALS  # anything with next_deal(), see deals.py
+        self.deal = None  # this hand's deal, 48 card indexes as bytes
+        self.trump_index = 0  # start with Hearts as trump, then rotate each hand
         self.passed_cards = {}
 
         # Game state tracking
@@ -82,10 +163,72 @@ class Game:
         self.lead_player_index = 0  # Index of player who led the current trick
         self.game_phase = "passing"  # "passing", "playing", "finished"
         self.round_number = 1
+        self.last_trick_messages = {}  # player -> message id
+        self.live_trick_messages = {}  # player -> message id
+        self.last_activity = time.monotonic()
+        self.views = weakref.WeakSet()  # outstanding prompts, so they can be stopped on close
+        self.observers = []  # async callables taking (game, event, data)
+        self.max_hands = max_hands
+        self.target_score = target_score
+        self.hand_results = []  # per hand: (trump index, [(tricks, jacks, score) per player], deal)
+        self.standings = list(self.players)  # players by match score, updated after each hand
+
+        self.deal_cards()
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    async def notify(self, event, **data):
+        # Tell observers about a game event. A failing observer must not break the game.
+        for observer in list(self.observers):
+            try:
+                await observer(self, event, data)
+            except Exception as e:
+                LOGGER.error(f"Observer {observer} failed on {event} for game {self.game_id}: {e}")
+
+    def close(self):
+        # Stop outstanding prompts so they no longer keep the game alive
+        for view in list(self.views):
+            view.stop()
+        self.views.clear()
+        if self.game_phase != "finished":
+            self.game_phase = "abandoned"
+        self.current_trick = []
         self.last_trick_messages = {}
         self.live_trick_messages = {}
 
-        self.deal_cards()
+    async def open_dm_channels(self, members):
+        # Remember each player's DM channel id so later messages can go through partial channels
+        for player, member in zip(self.players, members):
+            dm_channel = member.dm_channel or await member.create_dm()
+            player.dm_channel_id = dm_channel.id
+
+    def get_dm(self, player):
+        return self.client.get_partial_messageable(player.dm_channel_id, type=discord.ChannelType.private)
+
+    async def send_dm(self, player, **kwargs):
+        # Send a DM to a player and return the id of the message
+        message = await self.get_dm(player).send(**kwargs)
+        return message.id
+
+    async def edit_dm(self, player, message_id, **kwargs):
+        await self.get_dm(player).get_partial_message(message_id).edit(**kwargs)
+
+    async def delete_dm(self, player, message_id):
+        await self.get_dm(player).get_partial_message(message_id).delete()
+
+    async def hand_image(self, embed, hand, trick=(), highlight=()):
+        # In image mode, attach a picture of the hand to the embed. Returns the extra send kwargs.
+        if not card_images.enabled():
+            return {}
+        try:
+            png = await card_images.render(hand, trick, highlight)
+        except Exception as e:
+            # The text hand is still in the embed, so carry on without the picture
+            LOGGER.error(f"Could not render cards for game {self.game_id}: {e}")
+            return {}
+        embed.set_image(url="attachment://hand.png")
+        return {"file": discord.File(io.BytesIO(png), filename="hand.png")}
 
     async def send_live_trick_update(self):
         # Send or update live trick status to all players
@@ -121,11 +264,10 @@ class Game:
             try:
                 if player in self.live_trick_messages and self.live_trick_messages[player]:
                     # Update existing message
-                    await self.live_trick_messages[player].edit(embed=embed)
+                    await self.edit_dm(player, self.live_trick_messages[player], embed=embed)
                 else:
                     # Send new message
-                    message = await player.discord_user.send(embed=embed)
-                    self.live_trick_messages[player] = message
+                    self.live_trick_messages[player] = await self.send_dm(player, embed=embed)
             except discord.Forbidden:
                 LOGGER.warning(f"Could not send/update live trick to {player.name}")
                 self.live_trick_messages[player] = None
@@ -157,8 +299,8 @@ class Game:
 
     async def hide_previous_trick_cards(self):
         # Hide the cards from the previous trick announcement
-        for player, message in self.last_trick_messages.items():
-            if message:
+        for player, message_id in self.last_trick_messages.items():
+            if message_id:
                 try:
                     # Create a new embed with hidden card details
                     embed = discord.Embed(
@@ -170,13 +312,12 @@ class Game:
                     # Still show current scores
                     score_text = []
                     for p in self.players:
-                        tricks_this_hand = len(p.tricks)
-                        score_text.append(f"**{p.name}:** {tricks_this_hand} tricks (Total: {p.score})")
+                        score_text.append(f"**{p.name}:** {p.tricks_won} tricks (Total: {p.score})")
 
                     embed.add_field(name="Current Scores", value="\n".join(score_text), inline=False)
                     embed.set_footer(text=f"Trump: {self.get_trump_emoji()}")
 
-                    await message.edit(embed=embed)
+                    await self.edit_dm(player, message_id, embed=embed)
                 except discord.NotFound:
                     # Message was deleted, ignore
                     pass
@@ -205,6 +346,7 @@ class Game:
     async def play_card(self, player, card):
         # Handle when a player plays a card
         LOGGER.info(f"{player.name} played {card}")
+        self.touch()
 
         if len(self.current_trick) == 0 and self.last_trick_messages:
             await self.hide_previous_trick_cards()
@@ -214,6 +356,7 @@ class Game:
 
         # Add to current trick
         self.current_trick.append((player, card))
+        await self.notify("card_played", player=player, card=card)
 
         if len(self.current_trick) < len(self.players):
             # Trick not complete - show who's next
@@ -250,11 +393,10 @@ class Game:
 
             try:
                 if player in self.live_trick_messages and self.live_trick_messages[player]:
-                    await self.live_trick_messages[player].edit(embed=embed)
+                    await self.edit_dm(player, self.live_trick_messages[player], embed=embed)
                 else:
                     # Send new message if somehow we don't have one
-                    message = await player.discord_user.send(embed=embed)
-                    self.live_trick_messages[player] = message
+                    self.live_trick_messages[player] = await self.send_dm(player, embed=embed)
             except discord.Forbidden:
                 LOGGER.warning(f"Could not update final trick for {player.name}")
 
@@ -265,16 +407,16 @@ class Game:
 
         LOGGER.info(f"{winning_player.name} won the trick with {winning_card}")
 
-        # Add trick to winner's tricks
-        trick_cards = [card for player, card in self.current_trick]
-        winning_player.tricks.append(trick_cards)
+        # Score the trick as it is captured, so the hand total is ready when the hand ends
+        winning_player.tricks_won += 1
+        winning_player.jacks_caught += sum(1 for player, card in self.current_trick if card.rank == "J")
 
         # Delete live trick messages
         LOGGER.info(f"Attempting to delete {len(self.live_trick_messages)} live trick messages")
-        for player, message in self.live_trick_messages.items():
-            if message:
+        for player, message_id in self.live_trick_messages.items():
+            if message_id:
                 try:
-                    await message.delete()
+                    await self.delete_dm(player, message_id)
                 except discord.NotFound:
                     LOGGER.info(f"Message for {player.name} already deleted")
                 except discord.Forbidden:
@@ -287,6 +429,7 @@ class Game:
 
         # Announce winner to all players
         await self.announce_trick_winner(winning_player, winning_card)
+        await self.notify("trick_complete", winner=winning_player, card=winning_card)
 
         # Clear current trick
         self.current_trick = []
@@ -303,35 +446,56 @@ class Game:
             await self.prompt_current_player(True)
 
     async def complete_hand(self):
-        # Complete the current hand and calculate scores
+        # Complete the current hand, add it to the match and deal the next one
         LOGGER.info("Hand complete! Calculating scores...")
 
-        # Calculate scores for this hand
-        for player in self.players:
-            tricks_won = len(player.tricks)
-
-            # Count jacks in tricks
-            jacks_caught = 0
-            for trick in player.tricks:
-                jacks_caught += sum(1 for card in trick if card.rank == "J")
-
-            # Calculate penalty based on number of players
-            jack_penalty = -4 if len(self.players) == 3 else -3
+        # Calculate penalty based on number of players
+        jack_penalty = -4 if len(self.players) == 3 else -3
 
+        results = []
+        for player in self.players:
             # Score = tricks won + (jacks * penalty)
-            hand_score = tricks_won + (jacks_caught * jack_penalty)
+            hand_score = player.tricks_won + (player.jacks_caught * jack_penalty)
             player.score += hand_score
+            results.append((player.tricks_won, player.jacks_caught, hand_score))
 
-            LOGGER.info(
-                f"{player.name}: {tricks_won} tricks, {jacks_caught} jacks, score: {hand_score} (total: {player.score})")
+            LOGGER.info(f"{player.name}: {player.tricks_won} tricks, {player.jacks_caught} jacks, "
+                        f"score: {hand_score} (total: {player.score})")
 
-        # Send results to all players
-        await self.send_hand_results()
+        self.hand_results.append((self.trump_index, results, self.deal))
+        self.standings.sort(key=lambda p: -p.score)
 
-        # TODO: Check if game is complete or start next hand
-        self.game_phase = "finished"
+        match_over = self.is_match_over()
+        await self.send_hand_results(match_over)
+        await self.notify("hand_complete")
 
-    async def send_hand_results(self):
+        if match_over:
+            self.game_phase = "finished"
+            await self.notify("finished")
+        else:
+            await self.start_next_hand()
+
+    def is_match_over(self):
+        if self.max_hands and self.round_number >= self.max_hands:
+            return True
+        return bool(self.target_score) and self.standings[0].score >= self.target_score
+
+    async def start_next_hand(self):
+        # Rotate trumps and deal again into the same deck and hands
+        self.round_number += 1
+        self.trump_index = (self.trump_index + 1) % len(SUITS)
+        self.passed_cards.clear()
+        for player in self.players:
+            player.tricks_won = 0
+            player.jacks_caught = 0
+        self.deal_cards()
+        self.game_phase = "passing"
+
+        LOGGER.info(f"Game {self.game_id}: starting hand {self.round_number}, trump {self.get_trump_suit()}")
+        await self.send_hands_to_players()
+        await self.start_passing_phase()
+
+    async def send_hand_results(self, match_over=False):
         # Send hand results to all players
         embed = discord.Embed(
             title=f"Hand {self.round_number} Complete!",
@@ -339,26 +503,32 @@ class Game:
         )
 
         # Add results for each player
+        _, results, _ = self.hand_results[-1]
         results_text = []
-        for player in self.players:
-            tricks_won = len(player.tricks)
-            jacks_caught = sum(sum(1 for card in trick if card.rank == "J") for trick in player.tricks)
-            jack_penalty = -4 if len(self.players) == 3 else -3
-            hand_score = tricks_won + (jacks_caught * jack_penalty)
-
+        for player, (tricks_won, jacks_caught, hand_score) in zip(self.players, results):
             results_text.append(
                 f"**{player.name}:** {tricks_won} tricks, {jacks_caught} jacks → {hand_score:+d} pts (Total: {player.score})")
 
         embed.add_field(name="Results", value="\n".join(results_text), inline=False)
-        embed.set_footer(text=f"Trump was {self.get_trump_emoji()}")
+
+        if match_over:
+            standings_text = [f"{i}. **{player.name}:** {player.score} pts"
+                              for i, player in enumerate(self.standings, start=1)]
+            embed.add_field(name="Final Standings", value="\n".join(standings_text), inline=False)
+            embed.set_footer(text=f"Trump was {self.get_trump_emoji()} | Match over after {self.round_number} hands")
+        else:
+            embed.set_footer(text=f"Trump was {self.get_trump_emoji()} | Next hand: {self.hands_text(self.round_number + 1)}")
 
         # Send to all players
         for player in self.players:
             try:
-                await player.discord_user.send(embed=embed)
+                await self.send_dm(player, embed=embed)
             except discord.Forbidden:
                 LOGGER.warning(f"Could not send results to {player.name}")
 
+    def hands_text(self, hand):
+        return f"{hand}/{self.max_hands}" if self.max_hands else str(hand)
+
     def evaluate_trick(self):
         # Determine who wins the current trick
         if len(self.current_trick) != len(self.players):
@@ -426,10 +596,12 @@ class Game:
             embed.add_field(name="Valid Plays", value=valid_text, inline=False)
 
         embed.set_footer(text=f"Trump: {self.get_trump_emoji()}")
+        image = await self.hand_image(embed, sorted(current_player.hand), [card for _, card in self.current_trick])
 
         try:
             card_play_view = views.CardPlayView(self, current_player, valid_cards)
-            await current_player.discord_user.send(embed=embed, view=card_play_view)
+            self.views.add(card_play_view)
+            await self.send_dm(current_player, embed=embed, view=card_play_view, **image)
         except discord.Forbidden:
             LOGGER.warning(f"Could not DM {current_player.name} for card play")
 
@@ -453,8 +625,7 @@ class Game:
         # Add current scores
         score_text = []
         for player in self.players:
-            tricks_this_hand = len(player.tricks)
-            score_text.append(f"**{player.name}:** {tricks_this_hand} tricks (Total: {player.score})")
+            score_text.append(f"**{player.name}:** {player.tricks_won} tricks (Total: {player.score})")
 
         embed.add_field(name="Current Scores", value="\n".join(score_text), inline=False)
         embed.set_footer(text=f"Trump: {self.get_trump_emoji()}")
@@ -463,14 +634,13 @@ class Game:
         self.last_trick_messages = {}
         for player in self.players:
             try:
-                message = await player.discord_user.send(embed=embed)
-                self.last_trick_messages[player] = message
+                self.last_trick_messages[player] = await self.send_dm(player, embed=embed)
             except discord.Forbidden:
                 LOGGER.warning(f"Could not send trick result to {player.name}")
                 self.last_trick_messages[player] = None
 
     async def start_passing_phase(self):
-        LOGGER.info(f"Starting passing phase for {self.discord_players}")
+        LOGGER.info(f"Starting passing phase for {[player.name for player in self.players]}")
         for player in self.players:
             await self.send_passing_request(player)
 
@@ -489,12 +659,14 @@ class Game:
 
         try:
             view = views.CardPassingView(self, player, sorted_hand)
-            await player.discord_user.send(embed=embed, view=view)
+            self.views.add(view)
+            await self.send_dm(player, embed=embed, view=view)
         except discord.Forbidden:
             LOGGER.warning(f"Could not DM {player.name} for card passing")
 
     async def process_card_passing(self, player, cards_to_pass):
         # Handle when a player passes their cards
+        self.touch()
         # Remove cards from player's hand
         for card in cards_to_pass:
             player.hand.remove(card)
@@ -523,6 +695,7 @@ class Game:
             if previous_player in self.passed_cards:
                 received_cards = self.passed_cards[previous_player]
                 player.hand.extend(received_cards)
+        await self.notify("passing_complete")
 
         # Send updated hands to all players
         for i, player in enumerate(self.players):
@@ -539,20 +712,24 @@ class Game:
                 color=discord.Color.green()
             )
             embed.set_footer(text=f"Bold cards were passed to you by {previous_player.name} | Trump: {self.get_trump_emoji()}")
+            image = await self.hand_image(embed, sorted_hand, highlight=received_cards)
 
             try:
-                await player.discord_user.send(embed=embed)
+                await self.send_dm(player, embed=embed, **image)
             except discord.Forbidden:
                 LOGGER.warning(f"Could not send updated hand to {player.name}")
 
         await self.start_playing_phase()
 
     def deal_cards(self):
-        random.shuffle(self.deck)
+        # The deal is logged so any hand can be replayed with deals.DealList
+        self.deal = self.deals.next_deal()
+        LOGGER.info(f"Game {self.game_id} hand {self.round_number} deal {self.deal.hex()}")
+        self.deck[:] = [CARDS[index] for index in self.deal]
         num_players = len(self.players)
         hand_size = len(self.deck) // num_players
         for i, player in enumerate(self.players):
-            player.hand = self.deck[i * hand_size:(i + 1) * hand_size]
+            player.hand[:] = self.deck[i * hand_size:(i + 1) * hand_size]
 
     async def send_hands_to_players(self):
         for player in self.players:
@@ -560,7 +737,7 @@ class Game:
             hand_text = format_card_list(sorted_hand)
 
             embed = discord.Embed(
-                title="Your Hand",
+                title=f"Your Hand - Hand {self.hands_text(self.round_number)}",
                 description=f"{hand_text}\n\n**Trumps this round:** {self.get_trump_emoji()}",
                 color=discord.Color.blue()
             )
@@ -571,9 +748,10 @@ class Game:
                 value = f"{value}{i}. {j.name}\n"
 
             embed.add_field(name="Players",value=value)
+            image = await self.hand_image(embed, sorted_hand)
 
             try:
-                await player.discord_user.send(embed=embed)
+                await self.send_dm(player, embed=embed, **image)
                 LOGGER.info(f"Sent hand to {player.name}")
             except discord.Forbidden:
                 LOGGER.warning(f"Could not DM {player.name} - DMs might be disabled")
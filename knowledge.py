@@ -0,0 +1,151 @@
+from card_format import RANKS, SUIT_EMOJIS, SUITS
+
+RANKS_PER_SUIT = len(RANKS)
+JACK_RANK = RANKS.index("J")
+DECK_SIZE = len(SUITS) * RANKS_PER_SUIT
+
+# Card sets are 48-bit ints using jacks.Card.mask, so every update is a couple of
+# bit operations.
+ALL_CARDS = (1 << DECK_SIZE) - 1
+SUIT_MASKS = [((1 << RANKS_PER_SUIT) - 1) << (suit * RANKS_PER_SUIT) for suit in range(len(SUITS))]
+JACKS = [1 << (suit * RANKS_PER_SUIT + JACK_RANK) for suit in range(len(SUITS))]
+ALL_JACKS = sum(JACKS)
+
+# Binomial coefficients for every n, k up to a full deck
+COMB = [[0] * (DECK_SIZE + 1) for _ in range(DECK_SIZE + 1)]
+for _n in range(DECK_SIZE + 1):
+    COMB[_n][0] = 1
+    for _k in range(1, _n + 1):
+        COMB[_n][_k] = COMB[_n - 1][_k - 1] + COMB[_n - 1][_k]
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+def hand_mask(cards):
+    mask = 0
+    for card in cards:
+        mask |= card.mask
+    return mask
+
+
+def chance_of_none(pool, marked, drawn):
+    # Chance that `drawn` cards taken from `pool` include none of `marked` of them
+    if drawn <= 0 or marked <= 0:
+        return 1.0
+    if drawn > pool - marked:
+        return 0.0
+    return COMB[pool - marked][drawn] / COMB[pool][drawn]
+
+
+class CardTracker:
+    # What each seat can deduce about the other hands in the current hand: cards
+    # played, suits a seat showed out of by not following the lead, and cards a
+    # seat knows the next player holds because it passed them. It follows the
+    # game's events, so hints and AI seats can query it at any point.
+
+    def __init__(self, num_players):
+        self.num_players = num_players
+        self.reset()
+
+    def reset(self):
+        self.played = 0
+        self.voids = [0] * self.num_players  # bit per suit index
+        self.known = [[0] * self.num_players for _ in range(self.num_players)]  # [viewer][seat]
+
+    async def on_game_event(self, game, event, data):
+        if event == "card_played":
+            seat = game.players.index(data["player"])
+            lead_card = game.current_trick[0][1]
+            self.card_played(seat, data["card"], lead_card.suit)
+        elif event == "passing_complete":
+            for seat, player in enumerate(game.players):
+                self.cards_passed(seat, game.passed_cards.get(player, []))
+        elif event == "hand_complete":
+            self.reset()
+
+    def card_played(self, seat, card, lead_suit):
+        self.played |= card.mask
+        if card.suit != lead_suit:
+            self.voids[seat] |= 1 << SUITS.index(lead_suit)
+        for known in self.known:
+            known[seat] &= ~card.mask
+
+    def cards_passed(self, seat, cards):
+        # Players pass to their left, so the passer knows these are in the next hand
+        self.known[seat][(seat + 1) % self.num_players] |= hand_mask(cards)
+
+    def jacks_out(self):
+        return ALL_JACKS & ~self.played
+
+    def possible_cards(self, viewer, viewer_hand, seat):
+        # Cards `seat` may hold as far as `viewer` knows. Useful for pruning
+        # determinisation: sampled deals only need to draw from these.
+        known_elsewhere = 0
+        for other in range(self.num_players):
+            if other != seat:
+                known_elsewhere |= self.known[viewer][other]
+        possible = ALL_CARDS & ~self.played & ~hand_mask(viewer_hand) & ~known_elsewhere
+        for suit in range(len(SUITS)):
+            if self.voids[seat] >> suit & 1:
+                possible &= ~SUIT_MASKS[suit]
+        return possible | self.known[viewer][seat]
+
+    def jack_odds(self, viewer, viewer_hand, hand_sizes):
+        # For the viewer: chance each opponent holds each outstanding jack, and the
+        # chance they hold at least one. hand_sizes is the card count of each seat.
+        # Unknown cards are assumed spread evenly over the seats that can hold them.
+        own = hand_mask(viewer_hand)
+        opponents = [seat for seat in range(self.num_players) if seat != viewer]
+        unknown = ALL_CARDS & ~self.played & ~own
+        for seat in opponents:
+            unknown &= ~self.known[viewer][seat]
+
+        slots = {seat: hand_sizes[seat] - popcount(self.known[viewer][seat]) for seat in opponents}
+        candidates = {seat: self.possible_cards(viewer, viewer_hand, seat) & unknown for seat in opponents}
+
+        per_jack = {}
+        for suit, jack in enumerate(JACKS):
+            if not jack & self.jacks_out() or jack & own:
+                continue
+            holders = {}
+            known_holder = next((seat for seat in opponents if self.known[viewer][seat] & jack), None)
+            if known_holder is not None:
+                holders = {seat: float(seat == known_holder) for seat in opponents}
+            else:
+                eligible = [seat for seat in opponents if candidates[seat] & jack]
+                total = sum(slots[seat] for seat in eligible)
+                holders = {seat: (slots[seat] / total if total and seat in eligible else 0.0)
+                           for seat in opponents}
+            per_jack[suit] = holders
+
+        any_jack = {}
+        for seat in opponents:
+            if self.known[viewer][seat] & self.jacks_out():
+                any_jack[seat] = 1.0
+                continue
+            pool = popcount(candidates[seat])
+            marked = popcount(candidates[seat] & ALL_JACKS)
+            any_jack[seat] = 1.0 - chance_of_none(pool, marked, min(slots[seat], pool))
+        return per_jack, any_jack
+
+
+def format_hint(tracker, game, player):
+    viewer = game.players.index(player)
+    hand_sizes = [len(p.hand) for p in game.players]
+    per_jack, any_jack = tracker.jack_odds(viewer, player.hand, hand_sizes)
+
+    lines = []
+    for suit, holders in per_jack.items():
+        odds = ", ".join(f"{game.players[seat].name} {chance:.0%}" for seat, chance in holders.items())
+        lines.append(f"J{SUIT_EMOJIS[SUITS[suit]]}: {odds}")
+    if not lines:
+        lines.append("No jacks left in other hands.")
+
+    lines.append("")
+    for seat, chance in any_jack.items():
+        voids = "".join(SUIT_EMOJIS[SUITS[suit]] for suit in range(len(SUITS)) if tracker.voids[seat] >> suit & 1)
+        void_text = f" (out of {voids})" if voids else ""
+        lines.append(f"**{game.players[seat].name}**: {chance:.0%} chance of holding a jack{void_text}")
+    return "\n".join(lines)
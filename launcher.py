@@ -0,0 +1,56 @@
+import argparse
+import logging
+import os
+import secrets
+import subprocess
+import sys
+
+from dotenv import load_dotenv
+
+from sharding import assign_shards, serve_directory
+
+LOGGER = logging.getLogger(__name__)
+
+# Starts one bot process per worker, each owning a slice of the shards, plus the
+# local IPC server they share. e.g. `python launcher.py --shards 8 --workers 4`
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Jacks as several sharded worker processes")
+    parser.add_argument('--shards', type=int, required=True, help="total number of shards")
+    parser.add_argument('--workers', type=int, required=True, help="number of worker processes")
+    parser.add_argument('--address', default='127.0.0.1:50617', help="host:port for the IPC server")
+    args = parser.parse_args()
+
+    if args.workers > args.shards:
+        parser.error("need at least one shard per worker")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv()
+
+    authkey = secrets.token_hex(16)
+    serve_directory(args.address, authkey.encode('utf-8'))
+
+    processes = []
+    for worker_index, shard_ids in enumerate(assign_shards(args.shards, args.workers)):
+        env = dict(os.environ,
+                   SHARD_COUNT=str(args.shards),
+                   WORKER_INDEX=str(worker_index),
+                   WORKER_COUNT=str(args.workers),
+                   SHARD_IPC_ADDRESS=args.address,
+                   SHARD_IPC_KEY=authkey)
+        LOGGER.info(f"Starting worker {worker_index} with shards {shard_ids}")
+        processes.append(subprocess.Popen([sys.executable, 'main.py'], env=env))
+
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
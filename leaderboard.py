@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+LOGGER = logging.getLogger(__name__)
+
+# Player stats per guild and across every guild, kept as one running total row per
+# player and scope in SQLite. Hands are batched into one transaction each, written
+# from a thread. /leaderboard and /stats are served from memory: the top players of
+# each scope and recently looked up players are cached, and every write updates the
+# cached rows it touched instead of throwing the cache away.
+
+STATS = os.getenv('STATS', '1').lower() in ('1', 'true', 'yes')
+STATS_DB = os.getenv('STATS_DB', 'stats.db')
+TOP_N = 10
+BOARD_SIZE = TOP_N * 3  # rows cached per scope, so a few players dropping out of it doesn't force a reload
+PLAYER_CACHE_SIZE = 10000
+GLOBAL = 0  # scope of the stats across every guild
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS player_stats (
+    scope INTEGER NOT NULL,  -- guild id, or 0 for global
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    games INTEGER NOT NULL DEFAULT 0,
+    hands INTEGER NOT NULL DEFAULT 0,
+    tricks INTEGER NOT NULL DEFAULT 0,
+    jacks INTEGER NOT NULL DEFAULT 0,
+    score INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS player_stats_by_score ON player_stats (scope, score DESC);
+"""
+
+UPSERT = """
+INSERT INTO player_stats (scope, user_id, name, games, hands, tricks, jacks, score)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (scope, user_id) DO UPDATE SET
+    name = excluded.name,
+    games = games + excluded.games,
+    hands = hands + excluded.hands,
+    tricks = tricks + excluded.tricks,
+    jacks = jacks + excluded.jacks,
+    score = score + excluded.score
+"""
+
+SELECT = "SELECT scope, user_id, name, games, hands, tricks, jacks, score FROM player_stats"
+
+
+def enabled():
+    return STATS
+
+
+class PlayerStats:
+    __slots__ = ('scope', 'user_id', 'name', 'games', 'hands', 'tricks', 'jacks', 'score')
+
+    def __init__(self, scope, user_id, name, games, hands, tricks, jacks, score):
+        self.scope = scope
+        self.user_id = user_id
+        self.name = name
+        self.games = games
+        self.hands = hands
+        self.tricks = tricks
+        self.jacks = jacks
+        self.score = score
+
+    @property
+    def average(self):
+        # Average score per hand
+        return self.score / self.hands if self.hands else 0.0
+
+
+class Board:
+    # The best BOARD_SIZE players of a scope, best first. complete is set when the
+    # scope has no more players than that, so a row outside it can't be missing.
+    __slots__ = ('rows', 'complete', 'loaded_at')
+
+    def __init__(self, rows, complete):
+        self.rows = rows
+        self.complete = complete
+        self.loaded_at = time.monotonic()
+
+    def update(self, stats):
+        # Move or insert one updated player. Returns False if the board can no longer
+        # be trusted and has to be reloaded.
+        self.rows = [row for row in self.rows if row.user_id != stats.user_id]
+        if self.complete or (self.rows and stats.score > self.rows[-1].score):
+            self.rows.append(stats)
+            self.rows.sort(key=lambda row: -row.score)
+            if len(self.rows) > BOARD_SIZE:
+                del self.rows[BOARD_SIZE:]
+                self.complete = False
+        return self.complete or len(self.rows) >= TOP_N
+
+
+class StatsStore:
+    def __init__(self, path=STATS_DB, max_age=None):
+        self.path = path
+        self.max_age = max_age  # seconds before cached rows are reloaded, None if this process writes them all
+        self.connection = None
+        self.lock = None  # created on the running loop
+        self.pending = {}  # (scope, user id) -> [name, games, hands, tricks, jacks, score]
+        self.boards = {}  # scope -> Board
+        self.players = OrderedDict()  # (scope, user id) -> (PlayerStats, loaded at), least recently used first
+
+    def connect(self):
+        if self.connection is None:
+            # Only used from one thread at a time, under self.lock
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+        return self.connection
+
+    async def run(self, func, *args):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            return await asyncio.to_thread(func, *args)
+
+    def add_hand(self, guild_id, user_id, name, tricks, jacks, score, finished):
+        for scope in (guild_id, GLOBAL) if guild_id else (GLOBAL,):
+            totals = self.pending.setdefault((scope, user_id), [name, 0, 0, 0, 0, 0])
+            totals[0] = name
+            totals[1] += int(finished)
+            totals[2] += 1
+            totals[3] += tricks
+            totals[4] += jacks
+            totals[5] += score
+
+    def write(self, batch):
+        # Apply a batch of totals in one transaction and return the updated rows.
+        # Blocking, run it in a thread.
+        connection = self.connect()
+        with connection:
+            connection.executemany(UPSERT, [(scope, user_id, *totals) for (scope, user_id), totals in batch.items()])
+            return [PlayerStats(*connection.execute(f"{SELECT} WHERE scope = ? AND user_id = ?", key).fetchone())
+                    for key in batch]
+
+    async def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, {}
+        for stats in await self.run(self.write, batch):
+            self.cache_player(stats)
+            board = self.boards.get(stats.scope)
+            if board is not None and not board.update(stats):
+                del self.boards[stats.scope]
+
+    def cache_player(self, stats):
+        key = (stats.scope, stats.user_id)
+        self.players[key] = (stats, time.monotonic())
+        self.players.move_to_end(key)
+        while len(self.players) > PLAYER_CACHE_SIZE:
+            self.players.popitem(last=False)
+
+    def fresh(self, loaded_at):
+        return self.max_age is None or time.monotonic() - loaded_at < self.max_age
+
+    def load_board(self, scope):
+        rows = self.connect().execute(f"{SELECT} WHERE scope = ? ORDER BY score DESC LIMIT ?",
+                                      (scope, BOARD_SIZE + 1)).fetchall()
+        return Board([PlayerStats(*row) for row in rows[:BOARD_SIZE]], len(rows) <= BOARD_SIZE)
+
+    def load_player(self, scope, user_id):
+        row = self.connect().execute(f"{SELECT} WHERE scope = ? AND user_id = ?", (scope, user_id)).fetchone()
+        return PlayerStats(*row) if row else None
+
+    async def leaderboard(self, scope):
+        board = self.boards.get(scope)
+        if board is None or not self.fresh(board.loaded_at):
+            board = self.boards[scope] = await self.run(self.load_board, scope)
+        return board.rows[:TOP_N]
+
+    async def player_stats(self, scope, user_id):
+        key = (scope, user_id)
+        cached = self.players.get(key)
+        if cached is not None and self.fresh(cached[1]):
+            self.players.move_to_end(key)
+            return cached[0]
+        stats = await self.run(self.load_player, scope, user_id)
+        if stats is not None:
+            self.cache_player(stats)
+        return stats
+
+    async def close(self):
+        await self.flush()
+        if self.connection is not None:
+            await self.run(self.connection.close)
+
+
+class StatsRecorder:
+    # Game observer that adds every finished hand to the player stats
+
+    def __init__(self, store):
+        self.store = store
+
+    async def on_game_event(self, game, event, data):
+        if event != "hand_complete":
+            return
+
+        _, results, _ = game.hand_results[-1]
+        finished = game.is_match_over()
+        for player, (tricks_won, jacks_caught, hand_score) in zip(game.players, results):
+            self.store.add_hand(game.guild_id, player.user_id, player.name, tricks_won, jacks_caught,
+                                hand_score, finished)
+        try:
+            await self.store.flush()
+        except sqlite3.Error as e:
+            LOGGER.error(f"Could not record stats for game {game.game_id}: {e}")
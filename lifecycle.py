@@ -0,0 +1,85 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LifecycleManager:
+    # Expires idle lobbies and games. Every tracked object has a last_activity
+    # timestamp (time.monotonic); the heap is ordered by the deadline it had when
+    # pushed. When an entry reaches the top we re-check last_activity and push it
+    # back if it has been touched since, so touching an object costs nothing and
+    # each expiry check is O(log n). Each key has one live heap item, the one whose
+    # seq matches its entry; items left behind by re-tracking are dropped.
+
+    def __init__(self, interval=60):
+        self.interval = interval
+        self.heap = []  # (deadline, seq, key)
+        self.entries = {}  # key -> (obj, ttl, on_expire, seq of its heap item)
+        self.seq = itertools.count()
+        self.task = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def track(self, key, obj, ttl, on_expire):
+        # on_expire is an async callable taking the object
+        seq = next(self.seq)
+        self.entries[key] = (obj, ttl, on_expire, seq)
+        heapq.heappush(self.heap, (obj.last_activity + ttl, seq, key))
+
+    def rebind(self, key, on_expire):
+        # Swap the expiry callback of a tracked entry, keeping its place in the heap
+        if key in self.entries:
+            obj, ttl, _, seq = self.entries[key]
+            self.entries[key] = (obj, ttl, on_expire, seq)
+
+    def forget(self, key):
+        # The heap entry is dropped lazily when it reaches the top
+        self.entries.pop(key, None)
+
+    async def reap(self, now=None):
+        if now is None:
+            now = time.monotonic()
+
+        reclaimed = {}
+        while self.heap and self.heap[0][0] <= now:
+            _, seq, key = heapq.heappop(self.heap)
+            entry = self.entries.get(key)
+            if entry is None or entry[3] != seq:
+                continue  # forgotten or tracked again since it was pushed
+
+            obj, ttl, on_expire, _ = entry
+            deadline = obj.last_activity + ttl
+            if deadline > now:
+                seq = next(self.seq)
+                self.entries[key] = (obj, ttl, on_expire, seq)
+                heapq.heappush(self.heap, (deadline, seq, key))
+                continue
+
+            del self.entries[key]
+            kind = key[0]
+            reclaimed[kind] = reclaimed.get(kind, 0) + 1
+            metrics.counter(f"reaped_{kind}s").inc()
+            try:
+                await on_expire(obj)
+            except Exception as e:
+                LOGGER.error(f"Error expiring {key}: {e}")
+
+        if reclaimed:
+            LOGGER.info(f"Reaped {reclaimed}, {len(self.entries)} entries still tracked")
+        return reclaimed
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.reap()
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.run())
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+LAG_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+
+
+class LoopWatchdog:
+    # Measures event loop lag with a heartbeat task. A helper thread watches the
+    # heartbeat and, if the loop stops beating for longer than the threshold,
+    # logs the main thread's stack so we can see what blocked it.
+
+    def __init__(self, interval=0.25, threshold=1.0):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag_histogram = metrics.histogram("loop_lag_seconds", LAG_BUCKETS)
+        self.stall_counter = metrics.counter("loop_stalls")
+        self.last_beat = time.monotonic()
+        self.loop_thread_id = None
+        self.task = None
+        self.thread = None
+        self._stopped = threading.Event()
+        self._stall_reported = False
+
+    def start(self):
+        # Must be called from inside the running event loop
+        if self.task is not None:
+            return
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.task = asyncio.get_running_loop().create_task(self.heartbeat())
+        self.thread = threading.Thread(target=self.monitor, name="loop-watchdog", daemon=True)
+        self.thread.start()
+        LOGGER.info(f"Loop watchdog started (interval {self.interval}s, threshold {self.threshold}s)")
+
+    def stop(self):
+        self._stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.last_beat = time.monotonic()
+            self.lag_histogram.observe(lag)
+
+            if lag > self.threshold:
+                LOGGER.warning(f"Event loop lagged {lag:.3f}s")
+            self._stall_reported = False
+
+    def monitor(self):
+        # Runs in the helper thread
+        while not self._stopped.wait(self.interval):
+            stalled_for = time.monotonic() - self.last_beat - self.interval
+            if stalled_for > self.threshold and not self._stall_reported:
+                self._stall_reported = True
+                self.stall_counter.inc()
+                self.report_stall(stalled_for)
+
+    def report_stall(self, stalled_for):
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            LOGGER.warning(f"Event loop stalled for {stalled_for:.3f}s (no stack available)")
+            return
+
+        callback, game_id = describe_frame(frame)
+        stack = "".join(traceback.format_stack(frame))
+        LOGGER.warning(f"Event loop stalled for {stalled_for:.3f}s in callback {callback} "
+                       f"(game {game_id})\n{stack}")
+
+
+def describe_frame(frame):
+    # Walk a stack looking for the asyncio callback being run and the game it belongs to
+    callback = None
+    game_id = None
+    while frame is not None:
+        owner = frame.f_locals.get("self")
+        if callback is None and isinstance(owner, asyncio.Handle):
+            callback = repr(owner)
+        if game_id is None and owner is not None:
+            game_id = getattr(owner, "game_id", None)
+            if game_id is None:
+                game_id = getattr(getattr(owner, "game", None), "game_id", None)
+        frame = frame.f_back
+    return callback, game_id
@@ -1,18 +1,28 @@
+import asyncio
 import logging
 from logging.handlers import RotatingFileHandler
+from typing import Optional
 
 import discord
 from discord import app_commands
-from jacks import PreGame, Game
 from discord.ext import commands
 from dotenv import load_dotenv
 import os
 
-from views import CreateLobbyView
+#load .env before the local modules read their settings
+load_dotenv()
+TOKEN = os.getenv('DISCORD_TOKEN')
 
-#Setup logger
+import analytics
+import metrics
+import reloader
+import state
+from command_sync import sync_commands
+from loop_watchdog import LoopWatchdog
+
+#Setup logger, one file per worker when sharded so their rotations don't clash
 handler = RotatingFileHandler(
-    'discord.log',
+    f'discord-{state.shard_context.worker_index}.log' if state.shard_context.sharded else 'discord.log',
     maxBytes=5*1024*1024,  # 5MB per file
     backupCount=3,          # Keep 3 old files
     encoding='utf-8'
@@ -25,188 +35,154 @@ logging.basicConfig(
 
 LOGGER = logging.getLogger(__name__)
 
-#load .env
-load_dotenv()
-TOKEN = os.getenv('DISCORD_TOKEN')
-
-active_pregames = {}
-
-
-bot = commands.Bot(command_prefix='!', intents=discord.Intents.all())
-
-@bot.event
-async def on_ready():
-    LOGGER.info('Logged in as %s' % bot.user.name)
-    try:
-        synced = await bot.tree.sync()
-        LOGGER.info(f'Synced {len(synced)} commands')
-    except Exception as e:
-        LOGGER.error(f"Sync failed: {e}")
-@bot.event
-async def on_message(message):
-    if message.author == bot.user:
-        return
-    LOGGER.info(f"[{message.author} in #{message.channel}] {message.content}")
-
-@bot.tree.command(name="help")
-async def help(interaction: discord.Interaction):
-    embed = discord.Embed(
-        title="Help",
-        color=discord.Color.orange()
-    ).add_field(
-        name="Learn How to Play",
-        value="https://www.tiktok.com/@jacks.master/video/7079103590769478917",
-                inline=False
-    ).add_field(name="Commands",
-                value="**/jacks** - create a new lobby\n"
-                      "**/cancelgame** - close the lobby\n"
-                      "**/remove** `@user` - kick a player from the lobby\n"
-                      "**/leavegame** - leave a lobby\n"
-                      "**/ready** - start the game",
-                inline=False)
-    await interaction.response.send_message(embed=embed, ephemeral=True)
-
-@bot.tree.command(name="jacks")
-async def create_lobby(interaction: discord.Interaction):
-    channel_id = interaction.channel_id
-
-    # Check if there's already a game in this channel
-    if channel_id in active_pregames:
-        await interaction.response.send_message("There's already a Jacks game in this channel!", ephemeral=True)
-        return
-
-    pregame = PreGame(interaction)  # Updated to use direct import
-    active_pregames[channel_id] = pregame
-    await pregame.create_lobby(interaction.user)
-
-
-@bot.tree.command(name="remove")
-@app_commands.describe(player="The player to kick from the game")
-async def kick_player(interaction: discord.Interaction, player: discord.Member):
-    channel_id = interaction.channel_id
-
-    # Check if there's a game in this channel
-    if channel_id not in active_pregames:
-        await interaction.response.send_message("No active Jacks game in this channel!", ephemeral=True)
-        return
-
-    pregame = active_pregames[channel_id]
-
-    # Check if the user trying to kick is the game master
-    if interaction.user != pregame.master:
-        await interaction.response.send_message("Only the game master can kick players!", ephemeral=True)
-        return
-
-    # Check if the player is actually in the game
-    if player not in pregame.players:
-        await interaction.response.send_message(f"{player.mention} is not in the game!", ephemeral=True)
-        return
-
-    # Don't allow kicking yourself (the master)
-    if player == pregame.master:
-        await interaction.response.send_message("You cannot kick yourself! Use a different command to cancel the game.",
-                                                ephemeral=True)
-        return
-
-    # Remove the player
-    pregame.players.remove(player)
-    LOGGER.info(f"{interaction.user} kicked {player} from the game in {interaction.channel.name}")
+# Set DEV_GUILD_ID to sync commands to a single guild while developing
+DEV_GUILD_ID = int(os.getenv('DEV_GUILD_ID', '0')) or None
+FORCE_COMMAND_SYNC = os.getenv('FORCE_COMMAND_SYNC', '0').lower() in ('1', 'true', 'yes')
+# Every worker has the same tree, so only the first one syncs it (and writes the hash file)
+SYNCS_COMMANDS = state.shard_context.worker_index == 0
+commands_synced = False
 
-    await interaction.response.send_message(
-        f"{player.mention} has been kicked from the game by {interaction.user.mention}.")
+watchdog = LoopWatchdog(
+    interval=float(os.getenv('WATCHDOG_INTERVAL', '0.25')),
+    threshold=float(os.getenv('WATCHDOG_THRESHOLD', '1.0'))
+)
 
 
-@bot.tree.command(name="leavegame")
-async def leave_game(interaction: discord.Interaction):
-    channel_id = interaction.channel_id
+# Lean mode only asks for what slash commands, components and DMs need and keeps
+# the member and message caches small. Useful when the bot is in large guilds.
+LEAN_MODE = os.getenv('LEAN_MODE', '0').lower() in ('1', 'true', 'yes')
 
-    # Check if there's a game in this channel
-    if channel_id not in active_pregames:
-        await interaction.response.send_message("No active Jacks game in this channel!", ephemeral=True)
-        return
+if LEAN_MODE:
+    intents = discord.Intents.none()
+    intents.guilds = True
+    bot_options = dict(
+        intents=intents,
+        member_cache_flags=discord.MemberCacheFlags.none(),
+        max_messages=int(os.getenv('LEAN_MAX_MESSAGES', '100')) or None,
+        chunk_guilds_at_startup=False
+    )
+else:
+    bot_options = dict(intents=discord.Intents.all())
 
-    pregame = active_pregames[channel_id]
 
-    # Check if the player is in the game
-    if interaction.user not in pregame.players:
-        # Check if they're the master
-        if interaction.user == pregame.master:
-            await interaction.response.send_message("As the game master, use `/cancel` to cancel the game instead.",
-                                                    ephemeral=True)
-        else:
-            await interaction.response.send_message("You're not in this game!", ephemeral=True)
-        return
+class JacksBot(commands.AutoShardedBot if state.shard_context.sharded else commands.Bot):
+    async def setup_hook(self):
+        await self.load_extension(reloader.EXTENSION)
 
-    # Remove the player
-    pregame.players.remove(interaction.user)
-    LOGGER.info(f"{interaction.user} left the game in {interaction.channel.name}")
+    async def close(self):
+        if state.hand_store is not None:
+            await state.hand_store.flush()
+        if state.stats_store is not None:
+            await state.stats_store.close()
+        await super().close()
 
-    await interaction.response.send_message(f"{interaction.user.mention} has left the game.")
 
+if state.shard_context.sharded:
+    bot_options.update(shard_ids=state.shard_context.shard_ids,
+                       shard_count=state.shard_context.router.shard_count)
+bot = JacksBot(command_prefix='!', **bot_options)
 
-@bot.tree.command(name="cancelgame")
-async def cancel_game(interaction: discord.Interaction):
-    channel_id = interaction.channel_id
+inbox_task = None
+forwarded_tasks = set()  # keeps a reference to every forwarded message being handled
 
-    # Check if there's a game in this channel
-    if channel_id not in active_pregames:
-        await interaction.response.send_message("No active Jacks game in this channel!", ephemeral=True)
+@bot.event
+async def on_ready():
+    LOGGER.info('Logged in as %s' % bot.user.name)
+    LOGGER.info(f"Lean mode {'on' if LEAN_MODE else 'off'}, {len(bot.guilds)} guilds, "
+                f"{len(bot.users)} cached users\n{metrics.process_usage()}")
+    watchdog.start()
+    state.lifecycle.start()
+    state.deal_pool.start()
+    if state.hand_store is not None:
+        state.hand_store.start()
+
+    global inbox_task
+    if state.shard_context.inbox is not None and inbox_task is None:
+        inbox_task = bot.loop.create_task(process_inbox())
+
+    # on_ready fires again after reconnects, but the tree can't change in between
+    global commands_synced
+    if commands_synced or not SYNCS_COMMANDS:
         return
+    try:
+        await sync_commands(bot.tree, guild_id=DEV_GUILD_ID, force=FORCE_COMMAND_SYNC)
+        commands_synced = True
+    except Exception as e:
+        LOGGER.error(f"Sync failed: {e}")
 
-    pregame = active_pregames[channel_id]
-
-    # Check if the user is the game master
-    if interaction.user != pregame.master:
-        await interaction.response.send_message("Only the game master can cancel the game!", ephemeral=True)
+async def on_message(message):
+    if message.author == bot.user:
         return
+    LOGGER.info(f"[{message.author} in #{message.channel}] {message.content}")
 
-    if pregame.lobby_message:
-        disabled_view = CreateLobbyView(pregame)
-        for item in disabled_view.children:
-            item.disabled = True
-
-        embed = discord.Embed(title="Jacks - CANCELLED",
-                              description=f"~~{pregame.master.mention} has started a Jacks game!~~\n**This game has been cancelled.**")
-        await pregame.lobby_message.edit(embed=embed, view=disabled_view)
-
-    # Remove the game
-    del active_pregames[channel_id]
-
-    LOGGER.info(f"{interaction.user} cancelled the game in {interaction.channel.name}")
-
-    await interaction.response.send_message(f"The Jacks game has been cancelled by {interaction.user.mention}.")
-
-@bot.tree.command(name="ready")
-async def ready(interaction: discord.Interaction):
-    channel_id = interaction.channel_id
-
-    if channel_id not in active_pregames:
-        await interaction.response.send_message("No active Jacks game in this channel!", ephemeral=True)
+if not LEAN_MODE:
+    bot.add_listener(on_message)
+
+
+async def process_inbox():
+    # Messages forwarded by other workers are handed to whichever games cog is loaded.
+    # Each one gets its own task, so one slow Discord call doesn't hold up the rest.
+    while True:
+        message = await state.shard_context.receive()
+        cog = bot.get_cog('JacksCog')
+        if cog is None:
+            LOGGER.error(f"Games cog not loaded, dropping forwarded {message.get('type')}")
+            continue
+        task = bot.loop.create_task(cog.handle_forwarded(message))
+        forwarded_tasks.add(task)
+        task.add_done_callback(forwarded_done)
+
+
+def forwarded_done(task):
+    forwarded_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        LOGGER.error(f"Handling a forwarded message failed: {task.exception()!r}")
+
+
+@bot.tree.command(name="metrics")
+@app_commands.default_permissions(administrator=True)
+async def show_metrics(interaction: discord.Interaction):
+    await interaction.response.send_message(f"```\n{metrics.render_all()}\n```", ephemeral=True)
+
+@bot.tree.command(name="analytics")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(query="What to compute", players="Only games with this many players")
+@app_commands.choices(query=[app_commands.Choice(name=description, value=name)
+                             for name, (_, _, description) in analytics.QUERIES.items()])
+async def show_analytics(interaction: discord.Interaction, query: app_commands.Choice[str],
+                         players: Optional[app_commands.Range[int, 3, 4]] = None):
+    if state.hand_store is None:
+        await interaction.response.send_message("Analytics are not enabled.", ephemeral=True)
         return
 
-    pregame = active_pregames[channel_id]
-
-    if interaction.user != pregame.master:
-        await interaction.response.send_message(f"Only {pregame.master.mention} can start the game.", ephemeral=True)
+    await interaction.response.defer(ephemeral=True)
+    await state.hand_store.flush()
+    results = await asyncio.to_thread(state.hand_store.run_named, query.value, players)
+    text = analytics.format_results(query.value, results)
+    await interaction.followup.send(f"```\n{text[:1900]}\n```", ephemeral=True)
+
+@bot.tree.command(name="reload")
+@app_commands.default_permissions(administrator=True)
+async def reload_game_code(interaction: discord.Interaction):
+    if not await bot.is_owner(interaction.user):
+        await interaction.response.send_message("Only the bot owner can reload the game code.", ephemeral=True)
         return
 
-    if len(pregame.players) < 3 or len(pregame.players) > 4:
-        await interaction.response.send_message("Jacks can only be played with 3 or 4 players.", ephemeral=True)
+    await interaction.response.defer(ephemeral=True)
+    try:
+        paused, carried, stuck = await reloader.reload_game_code(bot)
+        if SYNCS_COMMANDS:
+            await sync_commands(bot.tree, guild_id=DEV_GUILD_ID)
+    except Exception as e:
+        LOGGER.error(f"Reload failed: {e}")
+        await interaction.followup.send(f"Reload failed: {e}", ephemeral=True)
         return
 
-    if pregame.lobby_message:
-        await pregame.lobby_message.delete()
-
-    await interaction.response.send_message(f"Game started! Check your DMs for your hand.")
-
-    #Start game
-    game = Game(pregame.players)
-    await game.send_hands_to_players()
-    await game.start_passing_phase()
-
+    message = f"Reloaded in {paused * 1000:.1f}ms, {carried} live games migrated."
+    if stuck:
+        message += f" {stuck} games kept the old code because their layout changed."
+    await interaction.followup.send(message, ephemeral=True)
 
-    # TODO store active game
-    # active_games[channel_id] = game
 
-    del active_pregames[channel_id]
-bot.run(TOKEN)
\ No newline at end of file
+if __name__ == '__main__':
+    bot.run(TOKEN)
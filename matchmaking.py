@@ -0,0 +1,101 @@
+import heapq
+import itertools
+import time
+
+# Matchmaking pool for /queue. Waiting players are bucketed by scope (a guild id,
+# or None for a global queue), preferred table size and rating band. Each bucket
+# is a heap ordered by when players joined, and every player has an index entry,
+# so joining, leaving and forming a table are all O(log n). Leaving only drops the
+# index entry; the heap item is skipped when it reaches the top.
+
+
+class QueueEntry:
+    __slots__ = ('member', 'bucket', 'enqueued_at', 'seq')
+
+    def __init__(self, member, bucket, enqueued_at, seq):
+        self.member = member
+        self.bucket = bucket
+        self.enqueued_at = enqueued_at
+        self.seq = seq
+
+
+class MatchmakingQueue:
+    def __init__(self, rating_band=None):
+        self.rating_band = rating_band  # width of a rating band, None to ignore ratings
+        self.buckets = {}  # bucket -> heap of (enqueued_at, seq, user id)
+        self.counts = {}  # bucket -> number of players waiting in it
+        self.entries = {}  # user id -> QueueEntry
+        self.seq = itertools.count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, user_id):
+        return user_id in self.entries
+
+    def bucket_for(self, scope, table_size, rating=None):
+        band = None
+        if self.rating_band and rating is not None:
+            band = int(rating // self.rating_band)
+        return scope, table_size, band
+
+    def join(self, member, scope, table_size, rating=None, enqueued_at=None):
+        # Add a player to the pool and return their bucket
+        if member.id in self.entries:
+            self.leave(member.id)
+        bucket = self.bucket_for(scope, table_size, rating)
+        if enqueued_at is None:
+            enqueued_at = time.monotonic()
+        entry = QueueEntry(member, bucket, enqueued_at, next(self.seq))
+        self.entries[member.id] = entry
+        heapq.heappush(self.buckets.setdefault(bucket, []), (enqueued_at, entry.seq, member.id))
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        return bucket
+
+    def requeue(self, entry):
+        # Put a popped player back in their bucket, keeping their place in line
+        if entry.member.id in self.entries:
+            return
+        entry.seq = next(self.seq)
+        self.entries[entry.member.id] = entry
+        heapq.heappush(self.buckets.setdefault(entry.bucket, []), (entry.enqueued_at, entry.seq, entry.member.id))
+        self.counts[entry.bucket] = self.counts.get(entry.bucket, 0) + 1
+
+    def leave(self, user_id):
+        entry = self.entries.pop(user_id, None)
+        if entry is None:
+            return False
+        self.counts[entry.bucket] -= 1
+
+        # Rebuild the heap once stale items outnumber live ones
+        heap = self.buckets[entry.bucket]
+        if len(heap) > 2 * self.counts[entry.bucket] + 32:
+            heap[:] = [item for item in heap
+                       if item[2] in self.entries and self.entries[item[2]].seq == item[1]]
+            heapq.heapify(heap)
+        return True
+
+    def waiting(self, bucket):
+        return self.counts.get(bucket, 0)
+
+    def pop_tables(self, bucket):
+        # Take as many full tables as the bucket can seat, longest-waiting players first
+        _, table_size, _ = bucket
+        heap = self.buckets.get(bucket, [])
+        tables = []
+        while self.counts.get(bucket, 0) >= table_size:
+            table = []
+            while len(table) < table_size:
+                _, seq, user_id = heapq.heappop(heap)
+                entry = self.entries.get(user_id)
+                if entry is None or entry.seq != seq:
+                    continue  # left the queue or re-joined since
+                del self.entries[user_id]
+                table.append(entry)
+            self.counts[bucket] -= table_size
+            tables.append(table)
+
+        if not heap:
+            self.buckets.pop(bucket, None)
+            self.counts.pop(bucket, None)
+        return tables
@@ -0,0 +1,77 @@
+import bisect
+import resource
+import time
+
+# Simple in-process metrics shared by the bot's subsystems
+
+_START_TIME = time.monotonic()
+
+
+class Counter:
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def render(self):
+        return f"{self.name}: {self.value}"
+
+
+class Histogram:
+    def __init__(self, name, buckets):
+        self.name = name
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def render(self):
+        if not self.count:
+            return f"{self.name}: no samples"
+        lines = [f"{self.name}: n={self.count} avg={self.total / self.count:.4f} max={self.max:.4f}"]
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f"  <= {bound:g}: {count}")
+        lines.append(f"  > {self.buckets[-1]:g}: {self.counts[-1]}")
+        return "\n".join(lines)
+
+
+REGISTRY = {}
+
+
+def counter(name):
+    # Get or create a counter by name
+    if name not in REGISTRY:
+        REGISTRY[name] = Counter(name)
+    return REGISTRY[name]
+
+
+def histogram(name, buckets):
+    # Get or create a histogram by name
+    if name not in REGISTRY:
+        REGISTRY[name] = Histogram(name, buckets)
+    return REGISTRY[name]
+
+
+def process_usage():
+    # Peak RSS and CPU time for this process, used to compare bot configurations
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    uptime = time.monotonic() - _START_TIME
+    return (f"uptime: {uptime:.0f}s\n"
+            f"cpu: user={usage.ru_utime:.2f}s system={usage.ru_stime:.2f}s\n"
+            f"max_rss: {usage.ru_maxrss / 1024:.1f} MB")
+
+
+def render_all():
+    lines = [process_usage()]
+    lines.extend(metric.render() for metric in REGISTRY.values())
+    return "\n".join(lines)
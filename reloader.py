@@ -0,0 +1,74 @@
+import importlib
+import logging
+import time
+
+import card_format
+import jacks
+import state
+import views
+
+LOGGER = logging.getLogger(__name__)
+
+EXTENSION = 'games_cog'
+
+# Hot reload of the game code. The game modules are reloaded in place, then live
+# objects are switched over to the new classes by reassigning __class__, so games
+# keep their state and outstanding prompt views keep working with the new code.
+# __class__ can only be swapped if the new class has the same __slots__ layout;
+# objects whose layout changed keep running on the old code until they end.
+
+
+def migrate(obj, module):
+    # Move obj onto the class of the same name in the reloaded module
+    new_cls = getattr(module, type(obj).__name__, None)
+    if new_cls is None or type(obj) is new_cls:
+        return True
+    try:
+        obj.__class__ = new_cls
+        return True
+    except TypeError as e:
+        LOGGER.warning(f"Could not migrate {type(obj).__name__}: {e}")
+        return False
+
+
+def migrate_game(game):
+    migrated = migrate(game, jacks)
+    for player in game.players:
+        migrated &= migrate(player, jacks)
+    for view in list(game.views):
+        migrate(view, views)
+        for item in view.children:
+            if type(item).__module__ == views.__name__:
+                migrate(item, views)
+    return migrated
+
+
+async def reload_game_code(bot):
+    # Returns (seconds paused, number of live games carried over, number left on old code)
+    start = time.perf_counter()
+    old_cards = jacks.CARDS
+    game_ids = jacks.Game._ids
+
+    for module in (card_format, views, jacks):
+        importlib.reload(module)
+    jacks.Game._ids = game_ids  # keep numbering so new games don't reuse live ids
+
+    # Cards are shared flyweights, so migrating the old deck migrates every hand
+    for card in old_cards:
+        migrate(card, jacks)
+
+    for pregame in state.active_pregames.values():
+        migrate(pregame, jacks)
+
+    carried, stuck = 0, 0
+    for game in state.active_games.values():
+        if migrate_game(game):
+            carried += 1
+        else:
+            stuck += 1
+
+    await bot.reload_extension(EXTENSION)
+
+    paused = time.perf_counter() - start
+    LOGGER.info(f"Reloaded game code in {paused * 1000:.1f}ms: {carried} games migrated, {stuck} left on old code")
+    return paused, carried, stuck
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+from multiprocessing.managers import BaseManager
+
+LOGGER = logging.getLogger(__name__)
+
+# Multi-process deployment: launcher.py starts one bot process per worker, each
+# owning a subset of the shards. Lobbies live with the worker owning their guild's
+# shard. Games are played through DMs, and Discord only delivers DM events
+# (including component interactions) on shard 0, so every game lives on the worker
+# owning shard 0 and other workers forward game starts to it. The launcher serves
+# a player directory and one inbox per worker over a local multiprocessing manager.
+
+
+def shard_for_guild(guild_id, shard_count):
+    # Same formula Discord uses to pick the shard for a guild
+    return (guild_id >> 22) % shard_count
+
+
+def assign_shards(shard_count, worker_count):
+    # Deal shards round-robin to workers: worker w gets w, w + n, w + 2n...
+    return [list(range(worker, shard_count, worker_count)) for worker in range(worker_count)]
+
+
+class ShardRouter:
+    def __init__(self, shard_count=1, worker_count=1):
+        self.shard_count = shard_count
+        self.worker_count = worker_count
+        self.assignment = assign_shards(shard_count, worker_count)
+        self.worker_of_shard = {shard: worker
+                                for worker, shards in enumerate(self.assignment)
+                                for shard in shards}
+
+    def worker_for_guild(self, guild_id):
+        if guild_id is None:
+            return self.worker_for_dms()
+        return self.worker_of_shard[shard_for_guild(guild_id, self.shard_count)]
+
+    def worker_for_dms(self):
+        return self.worker_of_shard[0]
+
+    def worker_for_games(self):
+        return self.worker_for_dms()
+
+
+class PlayerDirectory:
+    # Which game each user is in, shared by every worker
+
+    def __init__(self):
+        self.players = {}  # user id -> game key
+        self.lock = threading.Lock()
+
+    def claim(self, user_ids, game_key):
+        # Claim all users for a game, or none of them. Returns the users already in another game.
+        with self.lock:
+            busy = [user_id for user_id in user_ids
+                    if self.players.get(user_id, game_key) != game_key]
+            if not busy:
+                for user_id in user_ids:
+                    self.players[user_id] = game_key
+            return busy
+
+    def release(self, user_ids, game_key):
+        with self.lock:
+            for user_id in user_ids:
+                if self.players.get(user_id) == game_key:
+                    del self.players[user_id]
+
+    def lookup(self, user_id):
+        return self.players.get(user_id)
+
+
+class DirectoryManager(BaseManager):
+    pass
+
+
+_directory = PlayerDirectory()
+_inboxes = {}
+
+
+def _get_directory():
+    return _directory
+
+
+def _get_inbox(worker_index):
+    return _inboxes.setdefault(worker_index, queue.Queue())
+
+
+DirectoryManager.register('get_directory', callable=_get_directory)
+DirectoryManager.register('get_inbox', callable=_get_inbox)
+
+
+def parse_address(address):
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+def serve_directory(address, authkey):
+    # Run the IPC server in a background thread of the calling (launcher) process
+    manager = DirectoryManager(address=parse_address(address), authkey=authkey)
+    server = manager.get_server()
+    thread = threading.Thread(target=server.serve_forever, name="shard-directory", daemon=True)
+    thread.start()
+    return server
+
+
+class ShardContext:
+    # This process's place in the deployment. Without SHARD_COUNT set it is a
+    # single unsharded worker with an in-process directory.
+
+    def __init__(self, shard_count=None, worker_index=0, worker_count=1, address=None, authkey=None):
+        self.sharded = shard_count is not None
+        self.router = ShardRouter(shard_count or 1, worker_count)
+        self.worker_index = worker_index
+        self.shard_ids = self.router.assignment[worker_index]
+        self.manager = None
+        self.inbox = None
+
+        if address:
+            self.manager = DirectoryManager(address=parse_address(address), authkey=authkey)
+            self.manager.connect()
+            self.directory = self.manager.get_directory()
+            self.inbox = self.manager.get_inbox(worker_index)
+        else:
+            self.directory = PlayerDirectory()
+
+    @classmethod
+    def from_env(cls):
+        shard_count = os.getenv('SHARD_COUNT')
+        return cls(
+            shard_count=int(shard_count) if shard_count else None,
+            worker_index=int(os.getenv('WORKER_INDEX', '0')),
+            worker_count=int(os.getenv('WORKER_COUNT', '1')),
+            address=os.getenv('SHARD_IPC_ADDRESS'),
+            authkey=os.getenv('SHARD_IPC_KEY', '').encode('utf-8')
+        )
+
+    def owns_games(self):
+        return self.router.worker_for_games() == self.worker_index
+
+    async def _call(self, func, *args):
+        # Proxy calls block on a socket round trip, so keep them off the event loop
+        if self.manager is None:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    async def claim_players(self, user_ids, game_key):
+        return await self._call(self.directory.claim, list(user_ids), game_key)
+
+    async def release_players(self, user_ids, game_key):
+        await self._call(self.directory.release, list(user_ids), game_key)
+
+    async def lookup_player(self, user_id):
+        return await self._call(self.directory.lookup, user_id)
+
+    async def forward(self, worker_index, message):
+        # Send a message (a plain dict) to another worker's inbox
+        inbox = await self._call(self.manager.get_inbox, worker_index)
+        await self._call(inbox.put, message)
+
+    async def receive(self):
+        # Wait for the next message sent to this worker. Polls with a timeout so
+        # the executor thread never blocks shutdown for long.
+        while True:
+            try:
+                return await asyncio.to_thread(self.inbox.get, True, 1.0)
+            except queue.Empty:
+                continue
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import os
+import time
+
+import discord
+from card_format import SUIT_EMOJIS, format_card_emoji
+
+LOGGER = logging.getLogger(__name__)
+
+# Minimum seconds between edits of a spectator message
+SPECTATOR_INTERVAL = float(os.getenv('SPECTATOR_INTERVAL', '3'))
+
+
+class SpectatorBroadcast:
+    # One shared channel message per spectated game showing tricks and scores but
+    # never hands. It is fed by the game's events and edited at most once every
+    # SPECTATOR_INTERVAL seconds, whatever the number of spectators, so watching
+    # costs the same single message edit per interval for 1 or 50 people.
+
+    def __init__(self, game, channel):
+        self.game = game
+        self.game_id = game.game_id
+        self.channel = channel
+        self.spectators = set()  # user ids, only used for the count shown
+        self.message = None
+        self.final_event = None
+        self.last_trick = None  # (lines, winner name) of the last completed trick
+        self.dirty = False
+        self.last_edit = 0.0
+        self.task = None
+
+    def add(self, user_id):
+        self.spectators.add(user_id)
+
+    async def on_game_event(self, game, event, data):
+        if self.final_event:
+            return
+        if event == "trick_complete":
+            # The trick is cleared right after this event, so keep what we need now
+            self.last_trick = ([f"{p.name}: {format_card_emoji(card)}" for p, card in game.current_trick],
+                               data["winner"].name)
+        elif event in ("finished", "abandoned"):
+            self.final_event = event
+        self.schedule()
+
+    def schedule(self):
+        self.dirty = True
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        while self.dirty:
+            wait = self.last_edit + SPECTATOR_INTERVAL - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.dirty = False
+            self.last_edit = time.monotonic()
+            embed = self.build_embed()
+            try:
+                if self.message is None:
+                    self.message = await self.channel.send(embed=embed)
+                else:
+                    await self.message.edit(embed=embed)
+            except discord.HTTPException as e:
+                LOGGER.warning(f"Could not update spectator message for game {self.game_id}: {e}")
+
+        if self.final_event:
+            self.game = None  # let the game be freed
+
+    def build_embed(self):
+        game = self.game
+        if self.final_event:
+            title = f"Jacks - Game {self.final_event.capitalize()}"
+        else:
+            title = f"Jacks - Hand {game.hands_text(game.round_number)}"
+        embed = discord.Embed(title=title, color=discord.Color.dark_teal())
+
+        if game.current_trick:
+            trick_text = [f"{p.name}: {format_card_emoji(card)}" for p, card in game.current_trick]
+            embed.add_field(name="Current Trick", value="\n".join(trick_text), inline=False)
+        if self.last_trick:
+            lines, winner = self.last_trick
+            embed.add_field(name=f"Last Trick - won by {winner}", value="\n".join(lines), inline=False)
+
+        score_text = [f"**{p.name}:** {p.tricks_won} tricks (Total: {p.score})" for p in game.players]
+        embed.add_field(name="Scores", value="\n".join(score_text), inline=False)
+        if game.game_phase == "playing":
+            embed.add_field(name="Status", value=f"Waiting for **{game.get_current_player().name}**", inline=False)
+        embed.set_footer(text=f"{len(self.spectators)} watching | Trump: {SUIT_EMOJIS[game.get_trump_suit()]}")
+        return embed
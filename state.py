@@ -0,0 +1,41 @@
+import os
+
+import analytics
+import leaderboard
+from deals import DealPool
+from lifecycle import LifecycleManager
+from matchmaking import MatchmakingQueue
+from sharding import ShardContext
+
+# Live lobbies and games. They are kept here rather than in the games extension so
+# that reloading the game code (see reloader.py) doesn't lose them.
+
+active_pregames = {}  # channel id -> PreGame
+active_games = {}  # game id -> Game
+game_claims = {}  # game id -> (directory key, user ids)
+games_by_channel = {}  # channel id -> {game id: None}, in start order
+broadcasts = {}  # game id -> SpectatorBroadcast
+player_games = {}  # user id -> game id, for commands used from DMs
+trackers = {}  # game id -> knowledge.CardTracker
+
+deal_pool = DealPool()
+
+lifecycle = LifecycleManager(interval=int(os.getenv('REAP_INTERVAL', '60')))
+
+# Set by launcher.py when running as one of several sharded workers
+shard_context = ShardContext.from_env()
+
+# Players waiting in /queue. MATCHMAKING_RATING_BAND groups players whose average
+# score per hand (from the player stats) falls in the same band of that width.
+matchmaking_queue = MatchmakingQueue(rating_band=float(os.getenv('MATCHMAKING_RATING_BAND', '0')) or None)
+
+tournaments = {}  # channel id -> Tournament
+
+# Finished hands for /analytics, None when NumPy isn't installed or ANALYTICS=0
+hand_store = analytics.HandStore() if analytics.enabled() else None
+
+# Player stats for /leaderboard and /stats, None when STATS=0. Workers that don't
+# run games only read them, so their caches are refreshed every STATS_CACHE_TTL seconds.
+stats_store = leaderboard.StatsStore(
+    max_age=None if shard_context.owns_games() else int(os.getenv('STATS_CACHE_TTL', '30'))
+) if leaderboard.enabled() else None
@@ -0,0 +1,26 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import analytics
+
+
+def make_batch(rows, **values):
+    return {column: [values.get(column, 1)] * rows for column in analytics.COLUMNS}
+
+
+def test_failed_write_does_not_misalign_later_rows(tmp_path):
+    store = analytics.HandStore(str(tmp_path))
+    store.write(make_batch(2, tricks=5))
+
+    # A write that stopped after appending game_id, hand and seat
+    partial = make_batch(1, seat=99, hand=99)
+    for column, dtype in list(analytics.COLUMNS.items())[:3]:
+        with open(store.column_path(column), 'ab') as f:
+            np.asarray(partial[column], dtype=dtype).tofile(f)
+
+    store.write(make_batch(1, seat=2, hand=3, tricks=7))
+    data = store.load()
+    assert list(data['tricks']) == [5, 5, 7]
+    assert list(data['seat']) == [1, 1, 2]
+    assert list(data['hand']) == [1, 1, 3]
@@ -0,0 +1,16 @@
+import deals
+
+
+def test_seeded_streams_deal_the_same_hands():
+    first, second = deals.DealStream(1234), deals.DealStream(1234)
+    for _ in range(4):
+        deal = first.next_deal()
+        assert sorted(deal) == list(range(deals.DECK_SIZE))
+        assert deal == second.next_deal()
+
+
+def test_pool_deals_replay_from_hex():
+    pool = deals.DealPool(size=8)
+    played = [pool.next_deal() for _ in range(3)]
+    replay = deals.DealList.from_hex(deal.hex() for deal in played)
+    assert [replay.next_deal() for _ in range(3)] == played
@@ -0,0 +1,101 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from card_format import RANKS, SUITS
+from knowledge import CardTracker, JACKS, hand_mask
+
+
+def card(suit, rank):
+    # Stand-in for jacks.Card with the same index and mask
+    return SimpleNamespace(suit=suit, rank=rank, mask=1 << (SUITS.index(suit) * len(RANKS) + RANKS.index(rank)))
+
+
+DECK = [card(suit, rank) for suit in SUITS for rank in RANKS]
+
+
+def deal(rng, num_players):
+    deck = list(DECK)
+    rng.shuffle(deck)
+    size = len(deck) // num_players
+    return [deck[seat * size:(seat + 1) * size] for seat in range(num_players)]
+
+
+def pass_left(tracker, hands, rng, count=3):
+    passed = [rng.sample(hand, count) for hand in hands]
+    for seat, cards in enumerate(passed):
+        for passed_card in cards:
+            hands[seat].remove(passed_card)
+        hands[(seat + 1) % len(hands)].extend(cards)
+        tracker.cards_passed(seat, cards)
+
+
+def play_trick(tracker, hands, rng, leader, check):
+    lead_suit = None
+    for offset in range(len(hands)):
+        seat = (leader + offset) % len(hands)
+        following = [c for c in hands[seat] if c.suit == lead_suit]
+        played = rng.choice(following or hands[seat])
+        lead_suit = lead_suit or played.suit
+        hands[seat].remove(played)
+        tracker.card_played(seat, played, lead_suit)
+        check()
+
+
+@pytest.mark.parametrize("num_players", [3, 4])
+def test_inferences_always_agree_with_the_real_hands(num_players):
+    rng = random.Random(num_players)
+    for _ in range(20):
+        tracker = CardTracker(num_players)
+        hands = deal(rng, num_players)
+        pass_left(tracker, hands, rng)
+
+        def check():
+            sizes = [len(hand) for hand in hands]
+            for viewer in range(num_players):
+                for seat in range(num_players):
+                    if seat != viewer:
+                        real = hand_mask(hands[seat])
+                        assert tracker.possible_cards(viewer, hands[viewer], seat) & real == real
+
+                per_jack, _ = tracker.jack_odds(viewer, hands[viewer], sizes)
+                for holders in per_jack.values():
+                    assert sum(holders.values()) == pytest.approx(1.0)
+
+        check()
+        leader = 0
+        while hands[0]:
+            play_trick(tracker, hands, rng, leader, check)
+            leader = rng.randrange(num_players)
+
+
+def test_not_following_the_lead_marks_a_void():
+    tracker = CardTracker(3)
+    tracker.card_played(0, card("Hearts", "5"), "Hearts")
+    tracker.card_played(1, card("Spades", "9"), "Hearts")
+
+    possible = tracker.possible_cards(0, [], 1)
+    assert not possible & hand_mask([c for c in DECK if c.suit == "Hearts"])
+    assert possible & card("Spades", "10").mask
+    assert tracker.voids[1] == 1 << SUITS.index("Hearts")
+    assert tracker.voids[0] == 0
+
+
+def test_a_passed_jack_is_certain():
+    tracker = CardTracker(4)
+    jack = card("Clubs", "J")
+    tracker.cards_passed(0, [jack, card("Hearts", "3"), card("Hearts", "4")])
+    hand = [card("Spades", rank) for rank in RANKS]
+
+    per_jack, any_jack = tracker.jack_odds(0, hand, [12] * 4)
+    assert per_jack[SUITS.index("Clubs")] == {1: 1.0, 2: 0.0, 3: 0.0}
+    assert any_jack[1] == 1.0
+    # The viewer holds the jack of spades, so it isn't in anyone else's odds
+    assert JACKS[SUITS.index("Spades")] & hand_mask(hand)
+    assert SUITS.index("Spades") not in per_jack
+
+    # Once it is played, nobody holds it any more
+    tracker.card_played(1, jack, "Clubs")
+    per_jack, _ = tracker.jack_odds(0, hand, [12, 11, 12, 12])
+    assert SUITS.index("Clubs") not in per_jack
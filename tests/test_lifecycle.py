@@ -0,0 +1,31 @@
+import asyncio
+
+from lifecycle import LifecycleManager
+
+
+class Tracked:
+    def __init__(self, last_activity):
+        self.last_activity = last_activity
+
+
+def test_retracking_a_key_leaves_one_live_heap_item():
+    manager = LifecycleManager()
+    expired = []
+
+    async def on_expire(obj):
+        expired.append(obj)
+
+    for start in range(5):
+        manager.track(("lobby", 1), Tracked(start), 10, on_expire)
+        manager.forget(("lobby", 1))
+    latest = Tracked(5)
+    manager.track(("lobby", 1), latest, 10, on_expire)
+
+    # Stale items come due first and are dropped rather than pushed back
+    asyncio.run(manager.reap(now=14.5))
+    assert len(manager.heap) == 1
+    assert expired == []
+
+    asyncio.run(manager.reap(now=15))
+    assert expired == [latest]
+    assert not manager.heap
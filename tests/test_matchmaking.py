@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+from matchmaking import MatchmakingQueue
+
+
+def member(user_id):
+    return SimpleNamespace(id=user_id)
+
+
+def test_requeued_players_keep_their_place():
+    queue = MatchmakingQueue()
+    for user_id in range(1, 5):
+        bucket = queue.join(member(user_id), 9, 3, enqueued_at=user_id)
+
+    (table,) = queue.pop_tables(bucket)
+    assert [entry.member.id for entry in table] == [1, 2, 3]
+
+    # 2 got into another game, so 1 and 3 go back ahead of 4 and 5
+    for entry in table:
+        if entry.member.id != 2:
+            queue.requeue(entry)
+    queue.join(member(5), 9, 3, enqueued_at=5)
+    assert queue.waiting(bucket) == 4
+
+    (table,) = queue.pop_tables(bucket)
+    assert [entry.member.id for entry in table] == [1, 3, 4]
+    assert list(queue.entries) == [5]
@@ -0,0 +1,12 @@
+import metrics
+
+
+def test_render_all_includes_histogram_buckets():
+    histogram = metrics.histogram("test_latency_seconds", [0.1, 1.0])
+    histogram.observe(0.05)
+    histogram.observe(5.0)
+
+    rendered = metrics.render_all()
+    assert "test_latency_seconds: n=2" in rendered
+    assert "  <= 0.1: 1" in rendered
+    assert "  > 1: 1" in rendered
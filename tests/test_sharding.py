@@ -0,0 +1,51 @@
+from sharding import PlayerDirectory, ShardRouter, assign_shards, shard_for_guild
+
+
+def guild_on_shard(shard, shard_count):
+    # A guild id whose shard is `shard`, built the way Discord snowflakes are
+    return (shard + shard_count * 1000) << 22
+
+
+def test_guilds_route_to_the_worker_owning_their_shard():
+    router = ShardRouter(shard_count=6, worker_count=3)
+    assert router.assignment == assign_shards(6, 3) == [[0, 3], [1, 4], [2, 5]]
+
+    for shard in range(6):
+        guild_id = guild_on_shard(shard, 6)
+        assert shard_for_guild(guild_id, 6) == shard
+        assert router.worker_for_guild(guild_id) == shard % 3
+
+
+def test_dms_and_games_go_to_the_worker_owning_shard_0():
+    router = ShardRouter(shard_count=4, worker_count=2)
+    assert router.worker_for_dms() == 0
+    assert router.worker_for_games() == 0
+    assert router.worker_for_guild(None) == 0
+
+
+def test_claim_is_all_or_nothing():
+    directory = PlayerDirectory()
+    assert directory.claim([1, 2], "game:a") == []
+
+    # 2 is taken, so 3 must not be claimed either
+    assert directory.claim([2, 3], "game:b") == [2]
+    assert directory.lookup(2) == "game:a"
+    assert directory.lookup(3) is None
+
+    # Claiming again for the same game is fine
+    assert directory.claim([1, 2], "game:a") == []
+
+
+def test_release_only_frees_the_matching_game():
+    directory = PlayerDirectory()
+    directory.claim([1, 2], "lobby:1")
+    directory.release([1, 2], "lobby:1")
+    directory.claim([1], "queue:0:1")
+
+    # A late release for the old lobby must not free the player from the new table
+    directory.release([1, 2], "lobby:1")
+    assert directory.lookup(1) == "queue:0:1"
+    assert directory.lookup(2) is None
+
+    directory.release([1], "queue:0:1")
+    assert directory.lookup(1) is None
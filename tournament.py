@@ -0,0 +1,221 @@
+import asyncio
+import itertools
+import logging
+import random
+
+import discord
+
+import state
+
+LOGGER = logging.getLogger(__name__)
+
+STATUS_INTERVAL = 5  # seconds between edits of the tournament status message
+MAX_TABLE_LINES = 20
+
+
+def table_sizes(num_players):
+    # Split players into tables of 4, using tables of 3 for the remainder.
+    # Returns None when it can't be done (fewer than 3 players, or exactly 5).
+    threes = (4 - num_players % 4) % 4
+    if num_players < 3 or threes * 3 > num_players:
+        return None
+    return [4] * ((num_players - threes * 3) // 4) + [3] * threes
+
+
+def swiss_pairings(ranked_ids, opponents, sizes):
+    # Seat players with similar standings together, avoiding repeat opponents where
+    # possible: each table starts with the best remaining player and is filled with
+    # the next best players who haven't met anyone already seated there.
+    remaining = list(ranked_ids)
+    tables = []
+    for size in sizes:
+        table = [remaining.pop(0)]
+        while len(table) < size:
+            choice = 0
+            for i, user_id in enumerate(remaining):
+                met = opponents.get(user_id, ())
+                if not any(seated in met for seated in table):
+                    choice = i
+                    break
+            table.append(remaining.pop(choice))
+        tables.append(table)
+    return tables
+
+
+class TableStatus:
+    __slots__ = ('number', 'user_ids', 'tricks', 'total_tricks', 'done')
+
+    def __init__(self, number, user_ids, hands):
+        self.number = number
+        self.user_ids = user_ids
+        self.tricks = 0
+        self.total_tricks = 48 // len(user_ids) * hands  # an upper bound if the match has a target score
+        self.done = False
+
+
+class Tournament:
+    # Runs rounds of many tables at once. Every table reports back through game
+    # events: standings are updated as each table finishes, the next round is
+    # paired as soon as the last table of a round finishes, and progress goes into
+    # one status message that is edited at most every STATUS_INTERVAL seconds.
+
+    _ids = itertools.count(1)
+
+    def __init__(self, bot, organiser, channel, rounds, duplicate=False):
+        self.tournament_id = next(Tournament._ids)
+        self.bot = bot
+        self.organiser_id = organiser.id
+        self.channel = channel
+        self.total_rounds = rounds
+        self.duplicate = duplicate  # every table of a round plays the same deals
+        self.round_number = 0
+        self.phase = "signup"  # "signup", "running", "finished"
+        self.members = {}  # user id -> member, needed to open DMs for each round
+        self.standings = {}  # user id -> total score
+        self.opponents = {}  # user id -> set of user ids already played
+        self.tables = {}  # game id -> TableStatus, current round only
+        self.tables_left = 0
+        self.status_message = None
+        self.status_dirty = False
+        self.status_task = None
+        self.round_task = None
+
+    def join(self, member):
+        self.members[member.id] = member
+        self.standings.setdefault(member.id, 0)
+        self.opponents.setdefault(member.id, set())
+
+    def leave(self, user_id):
+        self.members.pop(user_id, None)
+        self.standings.pop(user_id, None)
+        self.opponents.pop(user_id, None)
+
+    def ranked(self):
+        return sorted(self.standings, key=lambda user_id: -self.standings[user_id])
+
+    def game_key(self):
+        return f"tournament:{self.tournament_id}:{self.round_number}"
+
+    async def start_round(self):
+        self.round_number += 1
+        self.phase = "running"
+        self.tables = {}
+
+        ranked = [user_id for user_id in self.ranked() if user_id in self.members]
+        sizes = table_sizes(len(ranked))
+        if sizes is None:
+            await self.finish(f"Not enough players left for round {self.round_number}.")
+            return
+
+        # Standings are all zero in the first round, so it is seated in join order
+        pairings = swiss_pairings(ranked, self.opponents, sizes)
+        for table in pairings:
+            for user_id in table:
+                self.opponents[user_id].update(other for other in table if other != user_id)
+
+        seed = random.getrandbits(64) if self.duplicate else None
+        cog = self.bot.get_cog('JacksCog')
+        games = await asyncio.gather(*(cog.start_tournament_table([self.members[user_id] for user_id in table],
+                                                                  self.channel.id, self.channel.guild.id,
+                                                                  f"{self.game_key()}:{number}", seed)
+                                       for number, table in enumerate(pairings, start=1)),
+                                     return_exceptions=True)
+
+        for number, (table, game) in enumerate(zip(pairings, games), start=1):
+            if isinstance(game, Exception) or game is None:
+                LOGGER.error(f"Tournament {self.tournament_id} could not start table {number}: {game}")
+                continue
+            self.tables[game.game_id] = TableStatus(number, table, game.max_hands or 1)
+            game.observers.append(self.on_game_event)
+
+        self.tables_left = len(self.tables)
+        LOGGER.info(f"Tournament {self.tournament_id} round {self.round_number}: {self.tables_left} tables"
+                    + (f", deal seed {seed}" if self.duplicate else ""))
+        self.mark_dirty()
+        if not self.tables_left:
+            await self.finish("No tables could be started.")
+
+    async def on_game_event(self, game, event, data):
+        table = self.tables.get(game.game_id)
+        if table is None or table.done:
+            return
+
+        if event == "trick_complete":
+            table.tricks += 1
+            self.mark_dirty()
+        elif event in ("finished", "abandoned"):
+            table.done = True
+            for player in game.players:
+                if player.user_id in self.standings:
+                    self.standings[player.user_id] += player.score
+            self.tables_left -= 1
+            self.mark_dirty()
+
+            if self.tables_left == 0:
+                # Don't hold up the interaction that finished the last table
+                if self.round_number < self.total_rounds:
+                    self.round_task = asyncio.get_running_loop().create_task(self.start_round())
+                else:
+                    await self.finish()
+
+    async def finish(self, reason=None):
+        self.phase = "finished"
+        if state.tournaments.get(self.channel.id) is self:
+            del state.tournaments[self.channel.id]
+        await self.update_status()
+        if reason:
+            LOGGER.info(f"Tournament {self.tournament_id} ended early: {reason}")
+            await self.channel.send(f"The tournament has ended: {reason}")
+
+    def mark_dirty(self):
+        # Coalesce progress from every table into one edit every STATUS_INTERVAL seconds
+        self.status_dirty = True
+        if self.status_task is None or self.status_task.done():
+            self.status_task = asyncio.get_running_loop().create_task(self.status_updater())
+
+    async def status_updater(self):
+        while self.status_dirty:
+            await self.update_status()
+            if self.phase == "finished":
+                return
+            await asyncio.sleep(STATUS_INTERVAL)
+
+    async def update_status(self):
+        self.status_dirty = False
+        embed = self.build_status_embed()
+        try:
+            if self.status_message is None:
+                self.status_message = await self.channel.send(embed=embed)
+            else:
+                await self.status_message.edit(embed=embed)
+        except discord.HTTPException as e:
+            LOGGER.warning(f"Could not update tournament {self.tournament_id} status: {e}")
+
+    def player_name(self, user_id):
+        member = self.members.get(user_id)
+        return member.display_name if member else str(user_id)
+
+    def build_status_embed(self):
+        if self.phase == "finished":
+            title = "Tournament - Final Standings"
+        else:
+            title = f"Tournament - Round {self.round_number}/{self.total_rounds}"
+        embed = discord.Embed(title=title, color=discord.Color.purple())
+        if self.duplicate:
+            embed.set_footer(text="Duplicate deals: every table of a round gets the same cards")
+
+        if self.phase == "running":
+            finished = len(self.tables) - self.tables_left
+            lines = [f"**{finished}/{len(self.tables)} tables finished**"]
+            playing = [table for table in self.tables.values() if not table.done]
+            for table in sorted(playing, key=lambda t: t.number)[:MAX_TABLE_LINES]:
+                lines.append(f"Table {table.number}: trick {table.tricks}/{table.total_tricks}")
+            if len(playing) > MAX_TABLE_LINES:
+                lines.append(f"...and {len(playing) - MAX_TABLE_LINES} more")
+            embed.description = "\n".join(lines)
+
+        standings = [f"{i}. {self.player_name(user_id)}: {self.standings[user_id]}"
+                     for i, user_id in enumerate(self.ranked()[:10], start=1)]
+        if standings:
+            embed.add_field(name="Standings", value="\n".join(standings), inline=False)
+        return embed
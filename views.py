@@ -15,6 +15,7 @@ class CreateLobbyView(discord.ui.View):
         ## TODO add leave button visible only to joined player that stops working when game has started
         if not interaction.user in self.pregame.players:
             self.pregame.players.append(interaction.user)
+            self.pregame.touch()
             LOGGER.info(f"Added {interaction.user} to the lobby.")
             await interaction.response.send_message(f"{interaction.user.mention} has joined the game.")
         else: